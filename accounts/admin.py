@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import CustomUser, OutboxEmail
+from .outbox import requeue
 
 
 class CustomUserAdmin(UserAdmin):
@@ -26,7 +27,23 @@ class CustomUserAdmin(UserAdmin):
     ordering = ('email',)
     
 
+
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'to', 'subject', 'state', 'attempts', 'run_after', 'sent_at']
+    list_filter = ['state']
+    search_fields = ['to', 'idempotency_key']
+    readonly_fields = ['idempotency_key', 'attempts', 'locked_at', 'last_error', 'created_at', 'sent_at']
+    actions = ['requeue_emails']
+
+    def requeue_emails(self, request, queryset):
+        count = requeue(queryset)
+        self.message_user(request, f"{count} email(s) queued again.")
+    requeue_emails.short_description = 'Queue selected emails again'
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
 
  
 
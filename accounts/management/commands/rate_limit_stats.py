@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from awaz.ratelimit import rejected_counts, reset_rejected_counts
+
+
+class Command(BaseCommand):
+    help = 'Show how many requests each rate limit policy has rejected.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Set the counters back to zero afterwards.')
+
+    def handle(self, *args, **options):
+        for policy, count in sorted(rejected_counts().items()):
+            self.stdout.write(f'{policy}: {count} rejected')
+        if options['reset']:
+            reset_rejected_counts()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
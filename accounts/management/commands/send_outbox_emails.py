@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.outbox import claim_batch, send_batch
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails in batches, one mail server connection per batch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--once', action='store_true', help='Send the emails that are due now and exit.')
+
+    def handle(self, *args, **options):
+        totals = {}
+        try:
+            while True:
+                close_old_connections()
+                emails = claim_batch(options['batch_size'])
+                if not emails:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                for state, count in send_batch(emails).items():
+                    totals[state] = totals.get(state, 0) + count
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the current batch.')
+
+        summary = ', '.join(f'{count} {state}' for state, count in sorted(totals.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f'Outbox: {summary}.'))
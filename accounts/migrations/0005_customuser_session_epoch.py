@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_remove_customuser_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='session_epoch',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
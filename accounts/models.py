@@ -1,6 +1,8 @@
 # accounts/models.py
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
 
 USER_TYPE_CHOICES = (
     ('user', 'User'),
@@ -72,6 +74,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_staff        = models.BooleanField(default=False)
     is_active        = models.BooleanField(default=False)
     is_superadmin        = models.BooleanField(default=False)
+    # Bumped to sign the user out everywhere (see accounts.sessions).
+    session_epoch   = models.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -84,8 +88,57 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    def get_session_auth_hash(self):
+        # Database sessions store this hash, so bumping session_epoch ends
+        # them too, not only signed cookies. Epoch 0 keeps Django's hash,
+        # which leaves sessions from before the epoch existed valid.
+        if not self.session_epoch:
+            return super().get_session_auth_hash()
+        return salted_hmac(
+            'accounts.CustomUser.get_session_auth_hash',
+            f'{self.password}:{self.session_epoch}',
+            algorithm='sha256',
+        ).hexdigest()
+
     def has_perm(self, perm, obj=None):
         return self.is_admin
 
     def has_module_perms(self, add_label):
         return True
+
+
+class OutboxEmail(models.Model):
+    """An email queued by a view and sent by the `send_outbox_emails` worker."""
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATE_CHOICES = (
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (DEAD, 'Dead'),
+    )
+
+    # Enqueueing the same key twice (a double submit, a retried request)
+    # sends one email.
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    to = models.EmailField(max_length=254)
+    subject = models.CharField(max_length=255)
+    template = models.CharField(max_length=255)
+    # JSON-serializable template context; a `user_id` is loaded as `user`.
+    context = models.JSONField(default=dict, blank=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [models.Index(fields=['state', 'run_after'], name='outboxemail_queue_idx')]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to} ({self.state})"
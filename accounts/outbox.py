@@ -0,0 +1,117 @@
+"""
+Transactional email outbox.
+
+Views only insert an ``OutboxEmail`` row, in the same transaction as the
+change that triggered it. ``manage.py send_outbox_emails`` claims committed
+rows in batches, renders them and sends each batch over one connection to
+``EMAIL_BACKEND``. Failed messages are retried with exponential backoff and
+end up ``dead`` after ``OUTBOX_MAX_ATTEMPTS`` tries. Use the console or
+file backend to read the messages locally.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 6)
+RETRY_DELAY = getattr(settings, 'OUTBOX_RETRY_DELAY', 60)
+# A batch still "sending" after this many seconds is assumed lost with its worker.
+LEASE_SECONDS = getattr(settings, 'OUTBOX_LEASE_SECONDS', 300)
+
+
+def enqueue_email(key, to, subject, template, context=None):
+    """Queue one email; a second call with the same ``key`` is a no-op."""
+    email, _ = OutboxEmail.objects.get_or_create(
+        idempotency_key=key,
+        defaults={'to': to, 'subject': subject, 'template': template, 'context': context or {}},
+    )
+    return email
+
+
+def claim_batch(limit):
+    """Lock up to ``limit`` due emails for this worker and mark them sending."""
+    now = timezone.now()
+    due = Q(state=OutboxEmail.PENDING, run_after__lte=now) | Q(
+        state=OutboxEmail.SENDING, locked_at__lt=now - timedelta(seconds=LEASE_SECONDS)
+    )
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('run_after', 'id')[:limit]
+        )
+        if emails:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                state=OutboxEmail.SENDING, locked_at=now, attempts=F('attempts') + 1
+            )
+    for email in emails:
+        email.state, email.locked_at, email.attempts = OutboxEmail.SENDING, now, email.attempts + 1
+    return emails
+
+
+def _message(email, users):
+    context = dict(email.context)
+    if 'user_id' in context:
+        context['user'] = users.get(context['user_id'])
+    body = render_to_string(email.template, context)
+    return EmailMessage(email.subject, body, settings.EMAIL_HOST_USER, [email.to])
+
+
+def _failed(email, error):
+    if email.attempts >= MAX_ATTEMPTS:
+        changes = {'state': OutboxEmail.DEAD}
+    else:
+        delay = RETRY_DELAY * 2 ** (email.attempts - 1)
+        changes = {'state': OutboxEmail.PENDING, 'run_after': timezone.now() + timedelta(seconds=delay)}
+    OutboxEmail.objects.filter(pk=email.pk).update(locked_at=None, last_error=error, **changes)
+    return changes['state']
+
+
+def send_batch(emails):
+    """Render and send claimed emails over one connection; returns {state: count}."""
+    totals = {}
+
+    def count(state):
+        totals[state] = totals.get(state, 0) + 1
+
+    # One query for every user the batch refers to.
+    user_ids = {email.context['user_id'] for email in emails if 'user_id' in email.context}
+    users = get_user_model().objects.in_bulk(user_ids)
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception:
+        error = traceback.format_exc()
+        for email in emails:
+            count(_failed(email, error))
+        return totals
+
+    try:
+        for email in emails:
+            try:
+                connection.send_messages([_message(email, users)])
+            except Exception:
+                count(_failed(email, traceback.format_exc()))
+                continue
+            OutboxEmail.objects.filter(pk=email.pk).update(
+                state=OutboxEmail.SENT, locked_at=None, last_error='', sent_at=timezone.now()
+            )
+            count(OutboxEmail.SENT)
+    finally:
+        connection.close()
+    return totals
+
+
+def requeue(queryset):
+    """Send dead (or any unsent) emails back to the queue with a fresh attempt budget."""
+    return queryset.exclude(state=OutboxEmail.SENT).update(
+        state=OutboxEmail.PENDING, attempts=0, run_after=timezone.now(), locked_at=None
+    )
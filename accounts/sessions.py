@@ -0,0 +1,67 @@
+"""
+Stateless sessions (``SESSION_MODE = 'signed'``).
+
+The session data lives in a signed cookie, and is compressed when
+``SESSION_COOKIE_COMPRESS`` is set. Requests then need no session storage
+at all. A cookie cannot be deleted server-side, so each login records the
+user's ``session_epoch`` in the session. Bumping the column
+(``revoke_sessions``) invalidates every cookie issued before; that is done
+by "log out everywhere" and by password changes, while a plain logout
+only clears the current cookie. The current
+epoch is read from the cache, so a request costs no extra query. With a
+per-process cache, other workers notice a revocation within
+``EPOCH_CACHE_TIMEOUT`` seconds.
+"""
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends import signed_cookies
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+EPOCH_SESSION_KEY = '_session_epoch'
+EPOCH_CACHE_TIMEOUT = getattr(settings, 'SESSION_EPOCH_CACHE_TIMEOUT', 60)
+COMPRESS = getattr(settings, 'SESSION_COOKIE_COMPRESS', True)
+SALT = 'django.contrib.sessions.backends.signed_cookies'
+
+
+def _epoch_key(user_id):
+    return f'accounts:session-epoch:{user_id}'
+
+
+def current_epoch(user_id):
+    from .models import CustomUser
+
+    key = _epoch_key(user_id)
+    epoch = cache.get(key)
+    if epoch is None:
+        epoch = CustomUser.objects.filter(pk=user_id).values_list('session_epoch', flat=True).first()
+        if epoch is None:
+            return None
+        cache.set(key, epoch, EPOCH_CACHE_TIMEOUT)
+    return epoch
+
+
+def revoke_sessions(user):
+    """Invalidate every signed session cookie issued to ``user`` so far."""
+    from .models import CustomUser
+
+    CustomUser.objects.filter(pk=user.pk).update(session_epoch=F('session_epoch') + 1)
+    user.refresh_from_db(fields=['session_epoch'])
+    transaction.on_commit(lambda: cache.delete(_epoch_key(user.pk)))
+
+
+class SessionStore(signed_cookies.SessionStore):
+
+    def load(self):
+        data = super().load()
+        user_id = data.get(SESSION_KEY)
+        if user_id is not None and data.get(EPOCH_SESSION_KEY) != current_epoch(user_id):
+            # Revoked: start over with an empty session, like a bad signature.
+            self.create()
+            return {}
+        return data
+
+    def _get_session_key(self):
+        return signing.dumps(self._session, compress=COMPRESS, salt=SALT, serializer=self.serializer)
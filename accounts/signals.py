@@ -0,0 +1,10 @@
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from .sessions import EPOCH_SESSION_KEY
+
+
+@receiver(user_logged_in)
+def remember_session_epoch(sender, request, user, **kwargs):
+    request.session[EPOCH_SESSION_KEY] = user.session_epoch
+
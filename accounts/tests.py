@@ -1,3 +1,43 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from awaz import ratelimit
+
+# Start of a 60 second bucket.
+T0 = 1_000_020.0
+
+
+class RetryAfterTests(TestCase):
+    """Retry-After is when the weighted sliding window lets a request through again."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        policies = mock.patch.dict(ratelimit.POLICIES, {'test': [('ip', 10, 60)]})
+        policies.start()
+        self.addCleanup(policies.stop)
+        self.request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+
+    def _check(self, now, times=1):
+        with mock.patch('awaz.ratelimit.time.time', return_value=now):
+            for _ in range(times):
+                wait = ratelimit.check(self.request, 'test')
+        return wait
+
+    def test_previous_bucket_keeps_the_limit_exceeded(self):
+        self.assertEqual(self._check(T0, times=10), 0)
+        # Halfway through the next bucket the previous 10 still weigh 5.
+        self.assertEqual(self._check(T0 + 90, times=5), 0)
+        # 10 * (1 - 42/60) + 6 + 1 = 10 at 42s into the bucket: 12s from now,
+        # not at the bucket end (30s).
+        self.assertEqual(self._check(T0 + 90), 12)
+        self.assertEqual(self._check(T0 + 102), 0)
+
+    def test_current_bucket_alone_exceeds_the_limit(self):
+        self.assertEqual(self._check(T0 + 30, times=10), 0)
+        # No previous bucket: past the bucket end, these 11 requests become
+        # the previous count and fit once 11 * (1 - x/60) + 1 <= 10.
+        self.assertEqual(self._check(T0 + 30), 41)
+        self.assertEqual(self._check(T0 + 71), 0)
@@ -7,6 +7,7 @@ urlpatterns = [
     path('login/', views.login, name='login'),
     path('activate/<uidb64>/<token>/', views.activate, name='activate'),
     path('logout/', views.logout, name='logout'),
+    path('logout/everywhere/', views.logout_everywhere, name='logout_everywhere'),
     path('forgotPassword/', views.forgotPassword, name='forgotPassword'),
     path('change_password/', views.change_password, name='change_password'),
     path('resetpassword_validate/<uidb64>/<token>/', views.resetpassword_validate, name='resetpassword_validate'),
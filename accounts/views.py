@@ -1,16 +1,23 @@
+import time
+
 from django.shortcuts import render, redirect
 from .forms import RegistrationForm
 from .models import CustomUser
+from .outbox import enqueue_email
+from .sessions import revoke_sessions
 from django.contrib.sites.shortcuts import get_current_site
 from django.utils.http import urlsafe_base64_encode
+from django.utils.crypto import salted_hmac
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
-from django.template.loader import render_to_string
+from django.db import transaction
 from django.utils.http import urlsafe_base64_decode
 from django.contrib import messages ,auth
 from django.contrib.auth import authenticate, login as auth_login
 from django.contrib.auth.decorators import login_required 
+from django.views.decorators.http import require_POST
 from django.contrib.auth import get_user_model
+from awaz.ratelimit import rate_limit
 
 
 User = get_user_model()
@@ -26,30 +33,31 @@ def register(request):
             password = form.cleaned_data['password']
             username = email.split("@")[0]
 
-            user = CustomUser.objects.create_user(
-                first_name=first_name,
-                last_name=last_name,
-                email=email,
-                username=username,
-                password=password
-            )
-            user.phone_number = phone_number
-            user.is_active = False # Require email activation
-            user.save()
-
-            # Prepare email verification
-            current_site = get_current_site(request)
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            token = default_token_generator.make_token(user)
-
-            message = render_to_string('accounts/account_verification_email.html', {
-                'user': user,
-                'domain': current_site.domain,
-                'uid': uid,
-                'token': token,
-            })
+            with transaction.atomic():
+                user = CustomUser.objects.create_user(
+                    first_name=first_name,
+                    last_name=last_name,
+                    email=email,
+                    username=username,
+                    password=password
+                )
+                user.phone_number = phone_number
+                user.is_active = False # Require email activation
+                user.save()
 
-            print("\nActivate your account:\n", message)
+                # Verification email, sent by the send_outbox_emails worker
+                enqueue_email(
+                    f'activation:{user.pk}',
+                    user.email,
+                    'Please activate your account',
+                    'accounts/account_verification_email.html',
+                    {
+                        'user_id': user.pk,
+                        'domain': get_current_site(request).domain,
+                        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+                        'token': default_token_generator.make_token(user),
+                    },
+                )
 
             # Redirect to login with message to check email
             return redirect('/accounts/login/?command=verification&email=' + email)
@@ -60,6 +68,7 @@ def register(request):
         return render(request, 'accounts/register.html', {'form': form})
     
 
+@rate_limit('login')
 def login(request):
     if request.method == 'POST':
         email = request.POST.get('email')
@@ -116,6 +125,16 @@ def logout(request):
     messages.success(request, 'You are logged out.')
     return redirect('login')
 
+@login_required(login_url = 'login')
+@require_POST
+def logout_everywhere(request):
+    # Also ends signed-cookie sessions on other devices and the admin session.
+    revoke_sessions(request.user)
+    auth.logout(request)
+    request.session.pop('frontend_login', None)
+    messages.success(request, 'You are logged out on every device.')
+    return redirect('login')
+
 @login_required(login_url='login')
 def change_password(request):
     if request.method == 'POST':
@@ -130,6 +149,7 @@ def change_password(request):
             if success:
                 user.set_password(new_password)
                 user.save()
+                revoke_sessions(user)
                 # auth.logout(request)
                 messages.success(request, 'Password updated successfully.')
                 return redirect('change_password')
@@ -162,15 +182,24 @@ def forgotPassword(request):
         if User.objects.filter(email=email).exists():
             user = User.objects.get(email__exact=email)
 
-            # Reset password email
-            current_site = get_current_site(request)
-            message = render_to_string('accounts/reset_password_email.html', {
-                'user': user,
-                'domain': current_site,
-                'uid': urlsafe_base64_encode(force_bytes(user.pk)),
-                'token': default_token_generator.make_token(user),
-            })
-            print("\nReset your account password:\n", message)
+            # Reset password email, sent by the send_outbox_emails worker.
+            # The token embeds a timestamp, so the key is built from what it
+            # is bound to (password and last login) plus the hour: repeated
+            # requests within the hour queue no second email.
+            token = default_token_generator.make_token(user)
+            state = salted_hmac('password-reset', f'{user.password}{user.last_login}').hexdigest()[:16]
+            enqueue_email(
+                f'password-reset:{user.pk}:{state}:{int(time.time() // 3600)}',
+                user.email,
+                'Reset your password',
+                'accounts/reset_password_email.html',
+                {
+                    'user_id': user.pk,
+                    'domain': get_current_site(request).domain,
+                    'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+                    'token': token,
+                },
+            )
             messages.success(request, 'Password reset link has been sent to your email.')
             return redirect('login')
 
@@ -190,6 +219,7 @@ def resetPassword(request):
             user = User.objects.get(pk=uid)
             user.set_password(password)
             user.save()
+            revoke_sessions(user)
             messages.success(request, 'Password reset successful')
             return redirect('login')
         else:
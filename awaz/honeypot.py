@@ -0,0 +1,103 @@
+"""
+Buffered recording for the fake admin login at /admin/.
+
+admin_honeypot writes one ``LoginAttempt`` row per probe. Here the
+attempts are instead kept in a per-process buffer and written with one
+``bulk_create`` when ``HONEYPOT_BATCH_SIZE`` attempts have piled up, or
+``HONEYPOT_FLUSH_INTERVAL`` seconds after the first one, whichever comes
+first. Within one buffer, at most ``HONEYPOT_MAX_PER_IP`` attempts from
+the same address are kept; the rest are dropped. ``HONEYPOT_DB_ALIAS``
+can point the writes at a database other than the primary.
+
+Recording is best effort. A failed write, or a worker killed before it
+flushes, loses that batch. Timestamps are set when the batch is written.
+The per-attempt ``honeypot`` signal is not sent, because buffered rows
+have no primary key yet (see ADMIN_HONEYPOT_EMAIL_ADMINS in settings).
+"""
+import atexit
+import threading
+from collections import Counter
+
+from admin_honeypot.models import LoginAttempt
+from admin_honeypot.views import AdminHoneypot
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from .ratelimit import client_ip
+
+BATCH_SIZE = getattr(settings, 'HONEYPOT_BATCH_SIZE', 100)
+FLUSH_INTERVAL = getattr(settings, 'HONEYPOT_FLUSH_INTERVAL', 10)
+MAX_PER_IP = getattr(settings, 'HONEYPOT_MAX_PER_IP', 20)
+DB_ALIAS = getattr(settings, 'HONEYPOT_DB_ALIAS', 'default')
+
+_lock = threading.Lock()
+_state = {'attempts': [], 'per_ip': Counter(), 'timer': None}
+
+
+def _take():
+    attempts = _state['attempts']
+    _state['attempts'], _state['per_ip'] = [], Counter()
+    if _state['timer'] is not None:
+        _state['timer'].cancel()
+        _state['timer'] = None
+    return attempts
+
+
+def _write(attempts):
+    if not attempts:
+        return 0
+    try:
+        LoginAttempt.objects.using(DB_ALIAS).bulk_create(attempts, batch_size=BATCH_SIZE)
+    except DatabaseError:
+        return 0
+    return len(attempts)
+
+
+def flush():
+    """Write out whatever is buffered; returns the number of rows written."""
+    with _lock:
+        attempts = _take()
+    return _write(attempts)
+
+
+def _flush_on_timer():
+    try:
+        flush()
+    finally:
+        connections.close_all()
+
+
+def record(request):
+    attempt = LoginAttempt(
+        username=request.POST.get('username'),
+        session_key=request.session.session_key,
+        ip_address=client_ip(request) or None,
+        user_agent=request.META.get('HTTP_USER_AGENT'),
+        path=request.get_full_path(),
+    )
+    batch = None
+    with _lock:
+        _state['per_ip'][attempt.ip_address] += 1
+        if MAX_PER_IP and _state['per_ip'][attempt.ip_address] > MAX_PER_IP:
+            return
+        _state['attempts'].append(attempt)
+        if len(_state['attempts']) >= BATCH_SIZE:
+            batch = _take()
+        elif _state['timer'] is None:
+            timer = threading.Timer(FLUSH_INTERVAL, _flush_on_timer)
+            timer.daemon = True
+            timer.start()
+            _state['timer'] = timer
+    if batch:
+        _write(batch)
+
+
+atexit.register(flush)
+
+
+class BufferedAdminHoneypot(AdminHoneypot):
+
+    def form_invalid(self, form):
+        record(self.request)
+        # Skip AdminHoneypot.form_invalid, which saves the row right away.
+        return super(AdminHoneypot, self).form_invalid(form)
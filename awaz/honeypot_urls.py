@@ -0,0 +1,11 @@
+from django.urls import re_path
+
+from .honeypot import BufferedAdminHoneypot
+
+# Same names as admin_honeypot.urls, which the view reverses.
+app_name = 'admin_honeypot'
+
+urlpatterns = [
+    re_path(r'^login/$', BufferedAdminHoneypot.as_view(), name='login'),
+    re_path(r'^.*$', BufferedAdminHoneypot.as_view(), name='index'),
+]
@@ -1,21 +1,79 @@
+import time
+
 from django.conf import settings
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.exceptions import SessionInterrupted
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+ADMIN_PATH_PREFIX = getattr(settings, 'ADMIN_SESSION_PATH_PREFIX', '/djangoadmin/')
+ADMIN_COOKIE_NAME = getattr(settings, 'ADMIN_SESSION_COOKIE_NAME', 'admin_sessionid')
+
+
+def session_cookie_name(request):
+    """The session cookie used for this request: Django admin and the site log in separately."""
+    if request.path.startswith(ADMIN_PATH_PREFIX):
+        return ADMIN_COOKIE_NAME
+    return settings.SESSION_COOKIE_NAME
+
+
+class DualCookieSessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware with the cookie name chosen per request. Settings are
+    never modified, so concurrent requests in threaded or ASGI workers
+    cannot pick up each other's cookie.
+    """
 
-class CustomSessionMiddleware(SessionMiddleware):
     def process_request(self, request):
-        # Switch session cookie name before session loads
-        if request.path.startswith('/djangoadmin/'):
-            settings.SESSION_COOKIE_NAME = 'admin_sessionid'
-        else:
-            settings.SESSION_COOKIE_NAME = 'frontend_sessionid'
-        
-        super().process_request(request)
+        session_key = request.COOKIES.get(session_cookie_name(request))
+        request.session = self.SessionStore(session_key)
 
     def process_response(self, request, response):
-        # Make sure to reset it here too, before saving the session cookie
-        if request.path.startswith('/djangoadmin/'):
-            settings.SESSION_COOKIE_NAME = 'admin_sessionid'
+        # Same as SessionMiddleware.process_response, with the per-request
+        # cookie name in place of settings.SESSION_COOKIE_NAME.
+        try:
+            accessed = request.session.accessed
+            modified = request.session.modified
+            empty = request.session.is_empty()
+        except AttributeError:
+            return response
+        cookie_name = session_cookie_name(request)
+        if cookie_name in request.COOKIES and empty:
+            response.delete_cookie(
+                cookie_name,
+                path=settings.SESSION_COOKIE_PATH,
+                domain=settings.SESSION_COOKIE_DOMAIN,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+            patch_vary_headers(response, ('Cookie',))
         else:
-            settings.SESSION_COOKIE_NAME = 'frontend_sessionid'
-        
-        return super().process_response(request, response)
\ No newline at end of file
+            if accessed:
+                patch_vary_headers(response, ('Cookie',))
+            if (modified or settings.SESSION_SAVE_EVERY_REQUEST) and not empty:
+                if request.session.get_expire_at_browser_close():
+                    max_age = None
+                    expires = None
+                else:
+                    max_age = request.session.get_expiry_age()
+                    expires = http_date(time.time() + max_age)
+                # Skip session save for 500 responses, refs Django #3881.
+                if response.status_code != 500:
+                    try:
+                        request.session.save()
+                    except UpdateError:
+                        raise SessionInterrupted(
+                            "The request's session was deleted before the "
+                            "request completed. The user may have logged "
+                            "out in a concurrent request, for example."
+                        )
+                    response.set_cookie(
+                        cookie_name,
+                        request.session.session_key, max_age=max_age,
+                        expires=expires, domain=settings.SESSION_COOKIE_DOMAIN,
+                        path=settings.SESSION_COOKIE_PATH,
+                        secure=settings.SESSION_COOKIE_SECURE or None,
+                        httponly=settings.SESSION_COOKIE_HTTPONLY or None,
+                        samesite=settings.SESSION_COOKIE_SAMESITE,
+                    )
+        return response
@@ -0,0 +1,213 @@
+"""
+Sliding-window rate limits for write endpoints.
+
+A view decorated with ``@rate_limit('<policy>')`` counts its POST requests
+against each rule of the policy before the view body runs. Rejected
+requests therefore never reach password hashing or the database. A rule
+is ``(key, limit, window_seconds)``, where ``key`` is ``'ip'``, ``'user'``
+(the logged-in user) or ``'email'`` (the submitted email field, for login).
+Rules whose key is empty for a request are skipped. ``RATE_LIMITS`` in
+settings overrides the policies below by name.
+
+Each window is approximated from two fixed buckets: the count of the
+previous bucket, weighted by how much of it still overlaps the window,
+plus the count of the current one. That costs two cache keys per client
+and rule, and no per-request timestamps. Counters live in the default
+cache, which has to be shared (memcached/redis) for limits to hold across
+workers. If the cache fails, a per-process in-memory store takes over
+until it is back.
+
+Rejections are counted per policy; ``manage.py rate_limit_stats`` shows them.
+"""
+import hashlib
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.utils.encoding import force_bytes
+
+ENABLED = getattr(settings, 'RATE_LIMIT_ENABLED', True)
+# Where the client address comes from; e.g. 'HTTP_X_FORWARDED_FOR' behind a proxy.
+IP_META = getattr(settings, 'RATE_LIMIT_IP_META', 'REMOTE_ADDR')
+
+POLICIES = {
+    'login': [('ip', 20, 300), ('email', 10, 600)],
+    'like': [('user', 30, 60), ('ip', 120, 60)],
+    'report': [('user', 10, 60), ('ip', 60, 60)],
+    'comment': [('user', 10, 60), ('ip', 60, 60)],
+    'post': [('user', 5, 600), ('ip', 20, 600)],
+}
+POLICIES.update(getattr(settings, 'RATE_LIMITS', {}))
+
+REJECTED_KEY = 'ratelimit:rejected:{}'
+
+
+class _LocalStore:
+    """Per-process stand-in for the cache counters, used while the cache is failing."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def incr(self, key, timeout):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._data) > 10000:
+                self._data = {k: v for k, v in self._data.items() if v[1] is None or v[1] > now}
+            value, expires = self._data.get(key, (0, None))
+            if value and expires is not None and expires <= now:
+                value = 0
+            if not value:
+                expires = None if timeout is None else now + timeout
+            self._data[key] = (value + 1, expires)
+            return value + 1
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._data.get(key, (0, None))
+            if expires is not None and expires <= time.monotonic():
+                return 0
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+_local = _LocalStore()
+
+
+def _incr(key, timeout):
+    try:
+        if cache.add(key, 1, timeout):
+            return 1
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr().
+            cache.set(key, 1, timeout)
+            return 1
+    except Exception:
+        return _local.incr(key, timeout)
+
+
+def _get(key):
+    try:
+        return cache.get(key) or 0
+    except Exception:
+        return _local.get(key)
+
+
+def client_ip(request):
+    value = request.META.get(IP_META) or request.META.get('REMOTE_ADDR', '')
+    # The right-most X-Forwarded-For entry is the one our own proxy added.
+    return value.split(',')[-1].strip()
+
+
+def _identify(request, key):
+    if key == 'ip':
+        return client_ip(request)
+    if key == 'user':
+        return request.user.pk if request.user.is_authenticated else None
+    if key == 'email':
+        return request.POST.get('email', '').strip().lower()
+    raise ValueError(f"Unknown rate limit key {key!r}.")
+
+
+def _retry_after(previous, current, limit, window, elapsed):
+    """
+    Seconds until one more request fits: ``previous * overlap + current + 1``
+    must come down to ``limit``, assuming nothing else arrives meanwhile.
+    """
+    # Within this bucket, as the previous bucket's weight fades.
+    if previous and current < limit:
+        wait = window * (1 - (limit - current - 1) / previous) - elapsed
+        if elapsed + wait < window:
+            return max(wait, 0)
+    wait = window - elapsed
+    # In the next bucket, where this bucket's count is the one that fades.
+    if current >= limit:
+        wait += window * (1 - (limit - 1) / current)
+    return wait
+
+
+def _hit(policy, key, identifier, limit, window, now):
+    """Count one request; returns seconds to wait if it is over ``limit``, else 0."""
+    digest = hashlib.md5(force_bytes(identifier)).hexdigest()
+    bucket = int(now // window)
+    elapsed = now % window
+    prefix = f'ratelimit:{policy}:{key}:{digest}'
+    current = _incr(f'{prefix}:{bucket}', window * 2)
+    previous = _get(f'{prefix}:{bucket - 1}')
+    if previous * (1 - elapsed / window) + current > limit:
+        return _retry_after(previous, current, limit, window, elapsed)
+    return 0
+
+
+def check(request, policy):
+    """Count the request against ``policy``; returns 0 if allowed, else seconds to wait."""
+    now = time.time()
+    for key, limit, window in POLICIES[policy]:
+        identifier = _identify(request, key)
+        if not identifier:
+            continue
+        wait = _hit(policy, key, identifier, limit, window, now)
+        if wait:
+            _incr(REJECTED_KEY.format(policy), None)
+            return max(1, math.ceil(wait))
+    return 0
+
+
+def rejected_counts():
+    """Rejected requests per policy since the counters were last reset."""
+    counts = {}
+    for policy in POLICIES:
+        key = REJECTED_KEY.format(policy)
+        try:
+            counts[policy] = cache.get(key) or 0
+        except Exception:
+            counts[policy] = 0
+        # Plus whatever this process counted while the cache was failing.
+        counts[policy] += _local.get(key)
+    return counts
+
+
+def reset_rejected_counts():
+    for policy in POLICIES:
+        key = REJECTED_KEY.format(policy)
+        _local.delete(key)
+        try:
+            cache.delete(key)
+        except Exception:
+            pass
+
+
+def _too_many(request, retry_after):
+    message = "Too many requests. Please try again later."
+    if 'application/json' in request.headers.get('Accept', ''):
+        response = JsonResponse({'error': message, 'retry_after': retry_after}, status=429)
+    else:
+        response = render(request, 'ratelimited.html', {'retry_after': retry_after}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(policy, methods=('POST',)):
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown rate limit policy {policy!r}.")
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if ENABLED and request.method in methods:
+                retry_after = check(request, policy)
+                if retry_after:
+                    return _too_many(request, retry_after)
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -53,7 +53,7 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'awaz.middleware.CustomSessionMiddleware',
+    'awaz.middleware.DualCookieSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -119,10 +119,52 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Shared by every worker in production (e.g. memcached); the local-memory
+# default is per process.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# The site and the Django admin keep separate sessions; see
+# awaz.middleware.DualCookieSessionMiddleware.
+SESSION_COOKIE_NAME = 'frontend_sessionid'
+ADMIN_SESSION_COOKIE_NAME = 'admin_sessionid'
+ADMIN_SESSION_PATH_PREFIX = '/djangoadmin/'
+# SESSION_MODE 'server' keeps sessions in the database. There they are
+# read from the cache and written through to the table, which needs a cache
+# every worker shares: with a per-process cache, a logout in one worker
+# would not reach the others, so that case keeps the plain db engine.
+# 'signed' keeps them in a signed cookie and needs no session storage (see
+# accounts/sessions.py).
+SESSION_MODE = config('SESSION_MODE', default='server')
+SESSION_COOKIE_COMPRESS = True
+if SESSION_MODE == 'signed':
+    SESSION_ENGINE = 'accounts.sessions'
+elif CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 SESSION_EXPIRE_SECONDS = 3600  # 1 hour
 SESSION_EXPIRE_AFTER_LAST_ACTIVITY = True
 SESSION_TIMEOUT_REDIRECT = 'login'
 
+# Per-IP and per-user limits on login and complaint writes (see awaz/ratelimit.py).
+# Behind a reverse proxy, set RATE_LIMIT_IP_META=HTTP_X_FORWARDED_FOR.
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+RATE_LIMIT_IP_META = config('RATE_LIMIT_IP_META', default='REMOTE_ADDR')
+
+# The fake /admin/ login buffers attempts and writes them in batches (see
+# awaz/honeypot.py). Its per-attempt admin email is off: buffered attempts
+# have no row to link to, and a mail per bot probe is the load we avoid.
+ADMIN_HONEYPOT_EMAIL_ADMINS = False
+HONEYPOT_BATCH_SIZE = 100
+HONEYPOT_FLUSH_INTERVAL = 10
+HONEYPOT_MAX_PER_IP = 20
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -154,6 +196,18 @@ TEMPLATES[0]['DIRS'] = [BASE_DIR / 'templates']
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Uploads are always spooled to disk and capped; see complaints/uploads.py.
+FILE_UPLOAD_HANDLERS = ['complaints.uploads.BoundedUploadHandler']
+COMPLAINT_IMAGE_MAX_BYTES = 15 * 1024 * 1024
+COMPLAINT_IMAGE_MAX_PIXELS = 25_000_000
+COMPLAINT_IMAGE_MAX_SIDE = 2560
+
+# Media is served by complaints.media.serve_media. Set to 'x-accel' (nginx,
+# internal location at MEDIA_ACCEL_PREFIX) or 'x-sendfile' to let the front
+# proxy send the bytes after Django has authorized the request.
+MEDIA_SERVE_MODE = 'django'
+MEDIA_ACCEL_PREFIX = '/protected-media/'
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -167,5 +221,13 @@ MESSAGE_TAGS = {
 }
 
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
-EMAIL_HOST_USER = 'CivicConnect@gamil.com'
\ No newline at end of file
+# Mail is queued in the outbox and delivered by `manage.py send_outbox_emails`
+# (see accounts/outbox.py). Set EMAIL_BACKEND to the smtp backend in production;
+# the console or file backend (EMAIL_FILE_PATH) prints or stores messages locally.
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_FILE_PATH = config('EMAIL_FILE_PATH', default=str(BASE_DIR / 'sent_emails'))
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='CivicConnect@gamil.com')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
\ No newline at end of file
@@ -46,6 +46,29 @@ $(document).ready(function() {
 
 
 
+	//////////////////////// Like buttons: update the count in place
+	$(document).on('submit', 'form.js-like-form', function (e) {
+		e.preventDefault();
+		var form = $(this);
+		var button = form.find('button');
+		$.ajax({
+			url: form.attr('action'),
+			type: 'POST',
+			dataType: 'json',
+			data: {
+				csrfmiddlewaretoken: form.find('[name=csrfmiddlewaretoken]').val(),
+				action: button.hasClass('btn-danger') ? 'unlike' : 'like'
+			}
+		}).done(function (data) {
+			button.toggleClass('btn-danger', data.liked).toggleClass('btn-outline-danger', !data.liked);
+			button.find('.js-like-count').text(data.likes_count);
+		}).fail(function () {
+			form[0].submit();  // fall back to the regular post and redirect
+		});
+	});
+
+
+
 	//////////////////////// Bootstrap tooltip
 	if($('[data-toggle="tooltip"]').length>0) {  // check if element exists
 		$('[data-toggle="tooltip"]').tooltip()
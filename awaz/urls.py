@@ -16,17 +16,19 @@ Including another URLconf
 """
 from awaz import views 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from . import views
-from django.conf.urls.static import static
+from complaints.media import serve_media
 from django.conf import settings 
 
 urlpatterns = [
-    path('admin/', include('admin_honeypot.urls', namespace='admin_honeypot')),
+    path('admin/', include('awaz.honeypot_urls')),
     path('djangoadmin/',admin.site.urls),
     path('',views.home, name='home'),
     path('accounts/', include('accounts.urls')),
     path('complaints/', include('complaints.urls')),
     path('dashboard/', include('dashboard.urls')),
+    path('api/v1/', include('complaints.api_urls')),
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
 
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
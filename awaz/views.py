@@ -1,6 +1,8 @@
 from django.shortcuts import render, redirect
 from complaints.models import Complaint
+from complaints.caching import cache_anonymous_page
 
+@cache_anonymous_page
 def home(request):
     # Check if logged in and session indicates frontend login
     if request.user.is_authenticated:
@@ -11,11 +13,11 @@ def home(request):
             return redirect('municipality_dashboard')
         
         elif request.user.user_type == 'user':
-            complaints = Complaint.objects.select_related('ward', 'user', 'municipality', 'category').order_by('-created_at')[:4]
+            complaints = Complaint.objects.for_feed(request.user).order_by('-created_at')[:4]
             return render(request, 'home.html', {'complaints': complaints})
         else:
             # Fallback: unknown user type
             return render(request, 'home.html')
 
-    complaints = Complaint.objects.select_related('ward', 'user', 'municipality', 'category', 'status').order_by('-created_at')[:4]
+    complaints = Complaint.objects.for_feed(request.user).order_by('-created_at')[:4]
     return render(request, 'home.html', {'complaints': complaints}) 
\ No newline at end of file
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Municipality, Category, Complaint, Status ,Ward ,Comment
+from .models import Municipality, Category, Complaint, MediaJob, Status ,Ward ,Comment
+from .jobs import requeue
 from .forms import ComplaintAdminForm 
 
 class MunicipalityAdmin(admin.ModelAdmin):
@@ -45,9 +46,23 @@ class CommentAdmin(admin.ModelAdmin):
 
 
 
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'complaint', 'image_name', 'state', 'attempts', 'run_after', 'updated_at']
+    list_filter = ['state']
+    readonly_fields = ['complaint', 'image_name', 'attempts', 'locked_at', 'last_error', 'created_at', 'updated_at']
+    actions = ['requeue_jobs']
+
+    def requeue_jobs(self, request, queryset):
+        count = requeue(queryset)
+        self.message_user(request, f"{count} job(s) queued again.")
+    requeue_jobs.short_description = 'Queue selected jobs again'
+
+
+
 admin.site.register(Municipality, MunicipalityAdmin)
 admin.site.register(Ward, WardAdmin)
 admin.site.register(Category)
 admin.site.register(Complaint, ComplaintAdmin)
 admin.site.register(Status)
 admin.site.register(Comment , CommentAdmin)
+admin.site.register(MediaJob, MediaJobAdmin)
@@ -0,0 +1,228 @@
+"""
+Read-only JSON API (mounted at /api/v1/) for the mobile client.
+
+Complaints are listed with the same filters as the HTML views
+(``ComplaintFilterForm``) and paged with opaque cursors. ``?fields=``
+limits every complaint to the named keys. Every response carries a weak
+ETag, so polling an unchanged list or complaint costs a 304. Complaint
+ETags come from each row's ``updated_at`` and engagement counters. Lookup
+table ETags come from the refdata version, so those 304s need no query.
+Hidden complaints are only visible to admins, as on ``post_detail``.
+``changes/`` is a delta feed for offline clients (see complaints.sync).
+"""
+import hashlib
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.encoding import force_bytes
+from django.views.decorators.http import require_safe
+
+from . import refdata, sync
+from .filters import ComplaintFilterForm, filter_paginator
+from .images import SIZES, derivative_url
+from .models import Complaint
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+SYNC_LIMIT = 500
+
+
+def _image(complaint):
+    if not complaint.image:
+        return None
+    image = {'url': complaint.image.url}
+    if complaint.has_thumbnails:
+        for size in SIZES:
+            image[size] = {ext: derivative_url(complaint.image, size, ext) for ext in ('webp', 'jpg')}
+    return image
+
+
+COMPLAINT_FIELDS = {
+    'id': lambda c: c.pk,
+    'title': lambda c: c.title,
+    'description': lambda c: c.description,
+    'author': lambda c: c.user.username,
+    'status': lambda c: c.status_id,
+    'category': lambda c: c.category_id,
+    'municipality': lambda c: c.municipality_id,
+    'ward': lambda c: c.ward_id,
+    'image': _image,
+    'is_hidden': lambda c: c.is_hidden,
+    'likes_count': lambda c: c.likes_count,
+    'comments_count': lambda c: c.comments_count,
+    'reports_count': lambda c: c.reports_count,
+    'liked': lambda c: c.viewer_has_liked,
+    'reported': lambda c: c.viewer_has_reported,
+    'created_at': lambda c: c.created_at,
+    'updated_at': lambda c: c.updated_at,
+}
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def api_view(view):
+    # GET/HEAD only, session authentication, and a JSON 401 rather than a
+    # redirect to the login page.
+    @require_safe
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error('Authentication required.', 401)
+        return view(request, *args, **kwargs)
+    return wrapped
+
+
+def _conditional(request, version, build):
+    """``build()`` the JSON body unless the client already has ``version``."""
+    etag = 'W/"%s"' % hashlib.md5(force_bytes(repr(version))).hexdigest()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(build())
+    response['ETag'] = etag
+    # Viewer-specific (liked/reported, hidden complaints): cache per user and revalidate.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _parse_fields(request):
+    """(fields, error response)."""
+    requested = request.GET.get('fields', '').strip()
+    if not requested:
+        return list(COMPLAINT_FIELDS), None
+    fields = list(dict.fromkeys(name.strip() for name in requested.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in COMPLAINT_FIELDS]
+    if unknown:
+        return None, _error('Unknown field(s): %s.' % ', '.join(unknown), 400)
+    return fields, None
+
+
+def _parse_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _serialize(complaint, fields):
+    return {name: COMPLAINT_FIELDS[name](complaint) for name in fields}
+
+
+def _version(complaint):
+    return (
+        complaint.pk, complaint.updated_at, complaint.likes_count, complaint.comments_count,
+        complaint.reports_count, complaint.viewer_has_liked, complaint.viewer_has_reported,
+    )
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri('?' + params.urlencode())
+
+
+@api_view
+def complaint_list(request):
+    fields, error = _parse_fields(request)
+    if error:
+        return error
+    filters = ComplaintFilterForm(request.GET).filters()
+    complaints = Complaint.objects.for_feed(request.user).visible_to(request.user)
+    paginator = filter_paginator(complaints, filters, _parse_limit(request))
+    page = paginator.get_page(request.GET.get('cursor'))
+
+    version = (request.user.pk, fields, [_version(c) for c in page], page.has_next(), page.has_previous())
+    return _conditional(request, version, lambda: {
+        'results': [_serialize(c, fields) for c in page],
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    })
+
+
+@api_view
+def complaint_detail(request, pk):
+    fields, error = _parse_fields(request)
+    if error:
+        return error
+    complaint = Complaint.objects.for_feed(request.user).visible_to(request.user).filter(pk=pk).first()
+    if complaint is None:
+        return _error('Not found.', 404)
+    version = (request.user.pk, fields, _version(complaint))
+    return _conditional(request, version, lambda: _serialize(complaint, fields))
+
+
+@api_view
+def complaint_changes(request):
+    """
+    Delta sync for the caller's ward (``?scope=ward``, the default) or
+    municipality. Without a ``token`` only the current token is returned:
+    take it first, then load the list once from ``complaints/``. After that,
+    poll with the returned token until ``has_more`` is false.
+    """
+    fields, error = _parse_fields(request)
+    if error:
+        return error
+    scope = request.GET.get('scope', 'ward')
+    if scope not in sync.SCOPES:
+        return _error('scope must be one of: %s.' % ', '.join(sync.SCOPES), 400)
+    scope_id = getattr(request.user, f'{scope}_id', None)
+    if scope_id is None:
+        return _error(f'Your account has no {scope}.', 400)
+
+    token = request.GET.get('token')
+    if not token:
+        sequence = sync.head(scope, scope_id)
+        return JsonResponse({
+            'changed': [], 'deleted': [], 'has_more': False,
+            'token': sync.make_token(scope, scope_id, sequence),
+        })
+    try:
+        sequence = sync.read_token(token, scope, scope_id)
+    except sync.TokenExpired as e:
+        return _error(str(e), 410)
+    except sync.InvalidToken as e:
+        return _error(str(e), 400)
+
+    complaint_ids, sequence, has_more = sync.changes_since(scope, scope_id, sequence, SYNC_LIMIT)
+    current = {
+        complaint.pk: complaint
+        for complaint in Complaint.objects.for_feed(request.user).visible_to(request.user)
+        .filter(pk__in=complaint_ids, **{f'{scope}_id': scope_id})
+    }
+    return JsonResponse({
+        'changed': [_serialize(current[pk], fields) for pk in complaint_ids if pk in current],
+        'deleted': [pk for pk in complaint_ids if pk not in current],
+        'has_more': has_more,
+        'token': sync.make_token(scope, scope_id, sequence),
+    })
+
+
+def _reference_view(build):
+    @api_view
+    def view(request):
+        return _conditional(request, refdata.version(), lambda: {'results': build()})
+    return view
+
+
+ward_list = _reference_view(lambda: [
+    {
+        'id': ward.pk,
+        'ward_number': ward.ward_number,
+        'municipality': ward.municipality_id,
+        'municipality_name': ward.municipality.name,
+    }
+    for ward in refdata.wards()
+])
+category_list = _reference_view(lambda: [
+    {'id': category.pk, 'name': category.category_name, 'slug': category.slug}
+    for category in refdata.categories()
+])
+status_list = _reference_view(lambda: [
+    {'id': status.pk, 'name': status.name} for status in refdata.statuses()
+])
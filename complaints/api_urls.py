@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import api
+
+urlpatterns = [
+    path('complaints/', api.complaint_list, name='api_complaint_list'),
+    path('complaints/<int:pk>/', api.complaint_detail, name='api_complaint_detail'),
+    path('complaints/changes/', api.complaint_changes, name='api_complaint_changes'),
+    path('wards/', api.ward_list, name='api_ward_list'),
+    path('categories/', api.category_list, name='api_category_list'),
+    path('statuses/', api.status_list, name='api_status_list'),
+]
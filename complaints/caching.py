@@ -0,0 +1,74 @@
+"""
+Whole-page cache for anonymous visitors.
+
+Cached pages are keyed by a global "complaints generation", a random
+stamp that is replaced whenever a complaint is created, edited, hidden,
+re-statused or deleted (see signals.py). Unlike a counter, a random stamp
+cannot restart at a value already used when the key is evicted, so stale
+page keys are never reused. A new complaint shows up on the next request
+while unchanged pages are served without touching the ORM. Engagement counters
+are allowed to lag by at most ``PAGE_CACHE_TIMEOUT`` seconds.
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import force_bytes
+
+from awaz.middleware import session_cookie_name
+
+GENERATION_KEY = 'complaints:generation'
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60)
+
+
+def complaints_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(GENERATION_KEY, generation, None):
+            generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def bump_complaints_generation():
+    transaction.on_commit(lambda: cache.set(GENERATION_KEY, uuid.uuid4().hex, None))
+
+
+def _is_cacheable(request):
+    # No session or pending messages: the visitor is anonymous and the page
+    # has nothing personal in it. Checked on cookies so a hit never loads a session.
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    return session_cookie_name(request) not in request.COOKIES and 'messages' not in request.COOKIES
+
+
+def cache_anonymous_page(view):
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not _is_cacheable(request):
+            return view(request, *args, **kwargs)
+
+        path = hashlib.md5(force_bytes(request.get_full_path())).hexdigest()
+        key = f'page:{complaints_generation()}:{path}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Page-Cache'] = 'hit'
+        else:
+            response = view(request, *args, **kwargs)
+            uncacheable = response.status_code != 200 or response.streaming or response.cookies
+            if uncacheable or request.META.get('CSRF_COOKIE_USED'):
+                return response
+            if hasattr(response, 'render'):
+                response.render()
+            cache.set(key, (response.content, response['Content-Type']), PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapped
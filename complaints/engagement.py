@@ -0,0 +1,95 @@
+"""
+Likes and reports written without a read-before-write.
+
+Adding a like is a plain INSERT guarded by the (user, complaint) unique
+constraint, and the stored counter is only incremented when it inserted a
+row. Removing one is a plain DELETE; the post_delete receiver in
+signals.py decrements the counter for each row actually deleted.
+Repeating a request therefore never double-counts.
+
+Reports also decide whether the complaint is hidden, so they run under a
+row lock on the complaint: concurrent reports are serialized and each one
+sees the count left by the previous one.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import Complaint, Like, Report
+
+# Complaints with at least this many reports are hidden from the feeds.
+REPORT_HIDE_THRESHOLD = getattr(settings, 'COMPLAINT_REPORT_HIDE_THRESHOLD', 3)
+
+
+def _add_like(user, complaint_id):
+    try:
+        with transaction.atomic():
+            Like.objects.create(user=user, complaint_id=complaint_id)
+            Complaint.adjust_counters(complaint_id, likes=1)
+    except IntegrityError:
+        # Already liked (or the complaint was deleted meanwhile).
+        return False
+    return True
+
+
+def _remove_like(user, complaint_id):
+    deleted, _ = Like.objects.filter(user=user, complaint_id=complaint_id).delete()
+    return bool(deleted)
+
+
+def set_like(user, complaint_id, liked=None):
+    """
+    Like (``liked=True``), unlike (``False``) or toggle (``None``) a
+    complaint. Returns ``(liked, likes_count)`` after the change.
+    """
+    if liked is None:
+        liked = _add_like(user, complaint_id)
+        if not liked:
+            _remove_like(user, complaint_id)
+    elif liked:
+        _add_like(user, complaint_id)
+    else:
+        _remove_like(user, complaint_id)
+    likes_count = Complaint.objects.filter(pk=complaint_id).values_list('likes_count', flat=True).first()
+    return liked, likes_count or 0
+
+
+def set_report(user, complaint_id, reported=None):
+    """
+    Report, unreport or toggle like ``set_like``, hiding the complaint when
+    it reaches ``REPORT_HIDE_THRESHOLD`` reports and unhiding it when an
+    unreport takes it below. Returns ``(reported, complaint)``; the complaint
+    is None if it no longer exists.
+    """
+    with transaction.atomic():
+        complaint = Complaint.objects.select_for_update().filter(pk=complaint_id).first()
+        if complaint is None:
+            return False, None
+        if reported is None:
+            reported = not Report.objects.filter(user=user, complaint_id=complaint_id).exists()
+        if reported:
+            try:
+                with transaction.atomic():
+                    Report.objects.create(user=user, complaint_id=complaint_id)
+                delta = 1
+            except IntegrityError:
+                delta = 0
+        else:
+            # The post_delete receiver has already decremented the stored
+            # counter; the save below writes the same value under the lock.
+            deleted, _ = Report.objects.filter(user=user, complaint_id=complaint_id).delete()
+            delta = -deleted
+        if not delta:
+            return reported, complaint
+
+        complaint.reports_count = max(complaint.reports_count + delta, 0)
+        update_fields = ['reports_count']
+        if delta > 0 and complaint.reports_count >= REPORT_HIDE_THRESHOLD and not complaint.is_hidden:
+            complaint.is_hidden = True
+            update_fields += ['is_hidden', 'updated_at']
+        elif delta < 0 and complaint.reports_count < REPORT_HIDE_THRESHOLD and complaint.is_hidden:
+            complaint.is_hidden = False
+            update_fields += ['is_hidden', 'updated_at']
+        # save() rather than update() so the dashboard stats, overview and
+        # page cache receivers see the visibility change.
+        complaint.save(update_fields=update_fields)
+    return reported, complaint
@@ -0,0 +1,67 @@
+"""
+Shared filter pipeline for the category/status/ward complaint views.
+
+The query string is validated by ``ComplaintFilterForm`` and turned into a
+single query on the indexed foreign keys. Results are always returned a
+page at a time, or streamed in fixed-size keyset chunks for exports, so a
+broad filter never loads every matching complaint at once.
+"""
+from django import forms
+
+from . import refdata
+from .search import search_paginator
+
+EXPORT_CHUNK_SIZE = 500
+
+
+class ComplaintFilterForm(forms.Form):
+    q = forms.CharField(required=False, max_length=100, strip=True)
+    category = forms.IntegerField(required=False, min_value=1)
+    status = forms.IntegerField(required=False, min_value=1)
+    municipality = forms.IntegerField(required=False, min_value=1)
+    ward_number = forms.IntegerField(required=False, min_value=1)
+
+    def filters(self):
+        """The valid parameters only; anything malformed is ignored."""
+        self.is_valid()
+        return {name: value for name, value in self.cleaned_data.items() if value not in (None, '')}
+
+
+def filter_complaints(queryset, params):
+    """Apply validated filter ``params`` (see ``ComplaintFilterForm``) to ``queryset``."""
+    if 'category' in params:
+        category = refdata.category_by_id(params['category'])
+        if category is None:
+            return queryset.none()
+        queryset = queryset.filter(category=category)
+
+    if 'status' in params:
+        status = refdata.status_by_id(params['status'])
+        if status is None:
+            return queryset.none()
+        queryset = queryset.filter(status=status)
+
+    # A ward is only identified by both its municipality and its number.
+    if 'municipality' in params and 'ward_number' in params:
+        ward = refdata.ward_by_number(params['municipality'], params['ward_number'])
+        if ward is None:
+            return queryset.none()
+        queryset = queryset.filter(ward=ward)
+
+    return queryset
+
+
+def filter_paginator(queryset, params, per_page):
+    """Paginator over the filtered complaints, relevance-ranked when there is a keyword."""
+    return search_paginator(filter_complaints(queryset, params), params.get('q', ''), per_page)
+
+
+def iter_filtered(queryset, params, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield every filtered complaint in page order, fetching ``chunk_size`` rows per query."""
+    paginator = filter_paginator(queryset, params, chunk_size)
+    page = paginator.get_page()
+    while True:
+        yield from page
+        if not page.has_next():
+            return
+        page = paginator.get_page(page.next_cursor)
@@ -0,0 +1,96 @@
+"""
+Resized derivatives of complaint photos.
+
+Every uploaded image gets a card-size and a detail-size copy, each as WebP
+with a JPEG fallback, stored under ``complaints/derivatives/``. Names are
+derived from the original's (content-addressed) name, so identical photos
+share derivatives and templates can build the URLs without touching the
+database.
+"""
+import os
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .storage import OverwritingStorage
+
+DERIVATIVE_DIR = 'complaints/derivatives'
+
+# Bounding boxes; images are shrunk to fit, never enlarged.
+SIZES = {
+    'card': (640, 480),
+    'detail': (1280, 960),
+}
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def derivative_name(name, size, ext):
+    # Keep the original extension in the stem so a.jpg and a.png stay apart.
+    stem = os.path.basename(name).replace('.', '_')
+    return f'{DERIVATIVE_DIR}/{stem}_{size}.{ext}'
+
+
+def derivative_url(field_file, size, ext):
+    return field_file.storage.url(derivative_name(field_file.name, size, ext))
+
+
+def _encode(image, ext):
+    fmt, options = FORMATS[ext]
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_derivatives(storage, name):
+    """Write every size/format of ``name`` to ``storage``, replacing any old copies."""
+    target_storage = getattr(storage, 'derivative_storage', storage)
+    largest = max(SIZES.values())
+    with storage.open(name, 'rb') as source:
+        with Image.open(source) as image:
+            # Let the JPEG decoder downscale while decoding; far cheaper than
+            # decoding a 12 MP photo at full size.
+            image.draft('RGB', largest)
+            image = ImageOps.exif_transpose(image)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+
+            written = []
+            for size, box in SIZES.items():
+                resized = image.copy()
+                resized.thumbnail(box, Image.LANCZOS, reducing_gap=3.0)
+                for ext in FORMATS:
+                    target = derivative_name(name, size, ext)
+                    if not isinstance(target_storage, OverwritingStorage) and target_storage.exists(target):
+                        target_storage.delete(target)
+                    written.append(target_storage.save(target, _encode(resized, ext)))
+    return written
+
+
+def delete_derivatives(storage, name):
+    for size in SIZES:
+        for ext in FORMATS:
+            target = derivative_name(name, size, ext)
+            if storage.exists(target):
+                storage.delete(target)
+
+
+
+def source_name(derivative):
+    """The stored image a derivative path was built from, or None."""
+    directory, filename = posixpath.split(derivative)
+    if directory != DERIVATIVE_DIR:
+        return None
+    stem, _, ext = filename.rpartition('.')
+    stem, _, size = stem.rpartition('_')
+    if ext not in FORMATS or size not in SIZES:
+        return None
+    base, _, original_ext = stem.rpartition('_')
+    if not base:
+        return None
+    return f'{base}.{original_ext}'
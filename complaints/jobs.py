@@ -0,0 +1,111 @@
+"""
+Database-backed queue for complaint image post-processing.
+
+The views only record a MediaJob in the same transaction as the complaint
+and return; `manage.py process_media_jobs` claims committed jobs and does
+the slow work. Failed jobs are retried with exponential backoff and end up
+in the ``dead`` state after ``MEDIA_JOB_MAX_ATTEMPTS`` tries.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .images import generate_derivatives
+from .models import Complaint, MediaJob
+
+MAX_ATTEMPTS = getattr(settings, 'MEDIA_JOB_MAX_ATTEMPTS', 5)
+RETRY_DELAY = getattr(settings, 'MEDIA_JOB_RETRY_DELAY', 30)
+# A running job whose worker has not finished within this many seconds is
+# assumed dead and can be claimed again.
+LEASE_SECONDS = getattr(settings, 'MEDIA_JOB_LEASE_SECONDS', 600)
+
+
+def enqueue_image_processing(complaint):
+    """Queue derivative generation for the complaint's current image."""
+    if not complaint.image:
+        return None
+    # The flags below change how the card renders its picture; updated_at
+    # keys the cached card fragment, so every flag update also touches it.
+    # Identical bytes share one stored file, and so its derivatives.
+    if Complaint.objects.filter(image=complaint.image.name, has_thumbnails=True).exclude(pk=complaint.pk).exists():
+        Complaint.objects.filter(pk=complaint.pk).update(
+            image_processing=False, has_thumbnails=True, updated_at=timezone.now()
+        )
+        complaint.image_processing = False
+        complaint.has_thumbnails = True
+        return None
+    Complaint.objects.filter(pk=complaint.pk).update(
+        image_processing=True, has_thumbnails=False, updated_at=timezone.now()
+    )
+    complaint.image_processing = True
+    complaint.has_thumbnails = False
+    return MediaJob.objects.create(complaint=complaint, image_name=complaint.image.name)
+
+
+def claim_jobs(limit):
+    """Lock up to ``limit`` due jobs for this worker and mark them running."""
+    now = timezone.now()
+    due = Q(state=MediaJob.PENDING, run_after__lte=now) | Q(
+        state=MediaJob.RUNNING, locked_at__lt=now - timedelta(seconds=LEASE_SECONDS)
+    )
+    with transaction.atomic():
+        jobs = list(
+            MediaJob.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('run_after', 'id')[:limit]
+        )
+        if jobs:
+            MediaJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                state=MediaJob.RUNNING, locked_at=now, attempts=F('attempts') + 1
+            )
+    for job in jobs:
+        job.state, job.locked_at, job.attempts = MediaJob.RUNNING, now, job.attempts + 1
+    return jobs
+
+
+def _finish(job, state, error='', **changes):
+    MediaJob.objects.filter(pk=job.pk).update(
+        state=state, locked_at=None, last_error=error, updated_at=timezone.now(), **changes
+    )
+
+
+def run_job(job):
+    """Process one claimed job; returns the state it ended in."""
+    complaint = Complaint.objects.filter(pk=job.complaint_id).only('pk', 'image').first()
+    if complaint is None or complaint.image.name != job.image_name:
+        # The complaint is gone or has a newer image with its own job.
+        _finish(job, MediaJob.DONE)
+        return MediaJob.DONE
+
+    try:
+        generate_derivatives(complaint.image.storage, job.image_name)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= MAX_ATTEMPTS:
+            _finish(job, MediaJob.DEAD, error)
+            Complaint.objects.filter(pk=job.complaint_id, image=job.image_name).update(
+                image_processing=False, updated_at=timezone.now()
+            )
+            return MediaJob.DEAD
+        delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+        _finish(job, MediaJob.PENDING, error, run_after=timezone.now() + timedelta(seconds=delay))
+        return MediaJob.PENDING
+
+    with transaction.atomic():
+        _finish(job, MediaJob.DONE)
+        Complaint.objects.filter(pk=job.complaint_id, image=job.image_name).update(
+            has_thumbnails=True, image_processing=False, updated_at=timezone.now()
+        )
+    return MediaJob.DONE
+
+
+def requeue(queryset):
+    """Send dead (or any) jobs back to the queue with a fresh attempt budget."""
+    complaint_ids = list(queryset.values_list('complaint_id', flat=True))
+    updated = queryset.update(state=MediaJob.PENDING, attempts=0, run_after=timezone.now(), locked_at=None)
+    Complaint.objects.filter(pk__in=complaint_ids).update(image_processing=True, updated_at=timezone.now())
+    return updated
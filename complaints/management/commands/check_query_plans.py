@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from complaints import queryplans
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every complaint view (first and next page) and EXPLAIN the "
+        "queries it runs; fail if a plan regresses to a full table scan or a "
+        "filesort. Use --seed on a scratch database so the optimizer has "
+        "realistic data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Insert this many synthetic complaints first.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not just failures.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            queryplans.seed(options['seed'])
+            self.stdout.write(f"Seeded {options['seed']} complaint(s).")
+
+        try:
+            viewers, complaint = queryplans.viewers()
+        except LookupError as exc:
+            raise CommandError(f'{exc} Run with --seed.')
+
+        # Response contexts (for the next-page cursor) and the test client's host.
+        setup_test_environment()
+
+        failures = []
+        for name, sql, plan, problems in queryplans.view_query_plans(viewers, complaint):
+            if problems:
+                if name not in failures:
+                    failures.append(name)
+                self.stdout.write(self.style.ERROR(f'FAIL {name}: {", ".join(problems)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok   {name}'))
+            if problems or options['verbose_plans']:
+                self.stdout.write(sql)
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'{len(failures)} query plan(s) regressed: {", ".join(failures)}')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from complaints.models import Complaint, ImageBlob
+from complaints.storage import collect_file
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount how many complaints reference each stored image and delete the files '
+        '(and derivatives) that nothing references any more.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change.')
+
+    def handle(self, *args, **options):
+        counts = dict(
+            Complaint.objects.exclude(image='').exclude(image__isnull=True)
+            .order_by().values_list('image').annotate(n=Count('pk'))
+        )
+        blobs = dict(ImageBlob.objects.values_list('name', 'refcount'))
+
+        fixed = [name for name, n in counts.items() if blobs.get(name) != n]
+        orphans = [name for name in blobs if name not in counts]
+
+        if not options['dry_run']:
+            with transaction.atomic():
+                for name in fixed:
+                    ImageBlob.objects.update_or_create(name=name, defaults={'refcount': counts[name]})
+                ImageBlob.objects.filter(name__in=orphans).update(refcount=0)
+            for name in orphans:
+                collect_file(name)
+
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(fixed)} drifted reference count(s) and {len(orphans)} unreferenced image(s).'
+        ))
@@ -0,0 +1,60 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from complaints.images import generate_derivatives
+from complaints.models import Complaint
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the card/detail WebP and JPEG derivatives for complaint images that do not '
+        'have them yet. Images are resized in a thread pool (Pillow releases the GIL while '
+        'decoding and resampling).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that already exist.')
+
+    def handle(self, *args, **options):
+        queryset = Complaint.objects.exclude(image='').exclude(image__isnull=True).order_by('pk')
+        if not options['force']:
+            queryset = queryset.filter(has_thumbnails=False)
+        rows = queryset.values_list('pk', 'image')
+        storage = Complaint._meta.get_field('image').storage
+
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            batch = []
+            for row in rows.iterator(chunk_size=options['batch_size']):
+                batch.append(row)
+                if len(batch) >= options['batch_size']:
+                    ok, bad = self._run(pool, storage, batch)
+                    done, failed, batch = done + ok, failed + bad, []
+            ok, bad = self._run(pool, storage, batch)
+            done, failed = done + ok, failed + bad
+
+        self.stdout.write(self.style.SUCCESS(f'Built derivatives for {done} image(s); {failed} failed.'))
+
+    def _run(self, pool, storage, batch):
+        # Workers only touch files; the flags are written from this thread.
+        futures = {pool.submit(generate_derivatives, storage, name): (pk, name) for pk, name in batch}
+        ready = []
+        failed = 0
+        for future in as_completed(futures):
+            pk, name = futures[future]
+            try:
+                future.result()
+            except Exception as exc:
+                # Pillow raises all sorts on corrupt files (ValueError,
+                # SyntaxError, ...); one bad legacy image must not stop the run.
+                failed += 1
+                self.stderr.write(f'Complaint {pk} ({name}): {type(exc).__name__}: {exc}')
+            else:
+                ready.append(pk)
+        Complaint.objects.filter(pk__in=ready).update(has_thumbnails=True, updated_at=timezone.now())
+        return len(ready), failed
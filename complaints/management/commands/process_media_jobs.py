@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from complaints.jobs import claim_jobs, run_job
+
+
+def _run(job):
+    try:
+        return run_job(job)
+    finally:
+        # Each pool thread has its own connection; don't leave it open between jobs.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Run queued complaint image jobs (thumbnails) with a pool of worker threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the jobs that are due now and exit.')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        totals = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while True:
+                    close_old_connections()
+                    jobs = claim_jobs(workers)
+                    if not jobs:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+                    for state in pool.map(_run, jobs):
+                        totals[state] = totals.get(state, 0) + 1
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping after the current jobs.')
+
+        summary = ', '.join(f'{count} {state}' for state, count in sorted(totals.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f'Media jobs: {summary}.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from complaints.sync import RETENTION_DAYS, prune
+
+
+class Command(BaseCommand):
+    help = (
+        f'Delete delta-sync change log rows older than the sync token lifetime '
+        f'({RETENTION_DAYS} days, plus one day of margin).'
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} change log row(s).'))
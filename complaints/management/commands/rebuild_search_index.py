@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from complaints.models import Complaint
+from complaints.search import refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search document and index of every complaint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = refresh_search_documents(Complaint.objects.order_by('pk'), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {count} complaint(s).'))
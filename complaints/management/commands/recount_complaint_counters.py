@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from complaints.models import Comment, Complaint, Like, Report
+
+
+def _count_subquery(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(complaint=OuterRef('pk'))
+            .order_by()
+            .values('complaint')
+            .annotate(n=Count('pk'))
+            .values('n'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored like/comment/report counters on complaints and repair any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only report drifted complaints.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        drifted = (
+            Complaint.objects.order_by()
+            .annotate(
+                real_likes=_count_subquery(Like),
+                real_comments=_count_subquery(Comment),
+                real_reports=_count_subquery(Report),
+            )
+            .filter(
+                ~Q(likes_count=F('real_likes'))
+                | ~Q(comments_count=F('real_comments'))
+                | ~Q(reports_count=F('real_reports'))
+            )
+            .values_list('pk', 'real_likes', 'real_comments', 'real_reports')
+        )
+
+        fixed = 0
+        batch = []
+        for pk, likes, comments, reports in drifted.iterator(chunk_size=batch_size):
+            batch.append(Complaint(pk=pk, likes_count=likes, comments_count=comments, reports_count=reports))
+            if len(batch) >= batch_size:
+                fixed += self._flush(batch, options['dry_run'])
+                batch = []
+        fixed += self._flush(batch, options['dry_run'])
+
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {fixed} complaint(s) with drifted counters.'))
+
+    def _flush(self, batch, dry_run):
+        if batch and not dry_run:
+            with transaction.atomic():
+                Complaint.objects.bulk_update(batch, ['likes_count', 'comments_count', 'reports_count'])
+        return len(batch)
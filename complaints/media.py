@@ -0,0 +1,177 @@
+"""
+Serving of uploaded media (complaint photos and their derivatives).
+
+Images of hidden complaints are only served to admins and the complaint's
+author. A complaint can be hidden at any time, so complaint images are
+sent as ``private, no-cache``: shared caches keep no copy, and browsers
+revalidate with the ETag on every use, which costs a 304 while access is
+unchanged. Every response supports conditional requests (ETag /
+Last-Modified) and single byte ranges. Only image types are served
+inline; any other file is sent as an ``application/octet-stream``
+attachment, so a file with an HTML (or similar) extension can never be
+rendered from the site's origin.
+
+With ``MEDIA_SERVE_MODE = 'x-accel'`` (nginx) or ``'x-sendfile'`` (Apache,
+lighttpd) Django only authorizes the request and the front proxy sends
+the file.
+"""
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .images import source_name
+from .models import Complaint
+from .storage import complaint_image_storage
+
+SERVE_MODE = getattr(settings, 'MEDIA_SERVE_MODE', 'django')
+ACCEL_PREFIX = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+MUTABLE_MAX_AGE = 24 * 60 * 60
+STREAM_CHUNK_SIZE = 64 * 1024
+# Extension -> Content-Type of the files served inline; fixed here rather
+# than guessed, so older mimetypes tables (no .webp) cannot change it.
+INLINE_TYPES = {
+    '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png',
+    '.webp': 'image/webp', '.gif': 'image/gif',
+}
+
+_HASHED_RE = re.compile(r'^([0-9a-f]{64})\.\w+$')
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _image_names(path):
+    """Complaint.image values a media path belongs to; None if it is not a complaint image."""
+    basename = source_name(path)
+    if basename is None:
+        if not path.startswith('complaints/'):
+            return None
+        basename = posixpath.basename(path)
+        if path == f'complaints/{basename}':
+            return [path]
+    hashed = _HASHED_RE.match(basename)
+    if hashed:
+        digest = hashed.group(1)
+        return [f'complaints/{digest[:2]}/{digest[2:4]}/{basename}']
+    return [f'complaints/{basename}']
+
+
+def _access(request, path):
+    """(allowed, public) for the current user; complaint images are never public."""
+    names = _image_names(path)
+    if names is None:
+        return True, True
+    owners = list(Complaint.objects.filter(image__in=names).values_list('is_hidden', 'user_id'))
+    if not owners:
+        return False, False
+    if any(not hidden for hidden, _ in owners):
+        return True, False
+    user = request.user
+    if user.is_authenticated and (user.user_type == 'admin' or any(uid == user.pk for _, uid in owners)):
+        return True, False
+    return False, False
+
+
+def _byte_range(request, size, etag, last_modified):
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    # A stale If-Range means the client's partial copy is outdated: send it all.
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range not in (etag, http_date(last_modified)):
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # Multiple or malformed ranges: fall back to the full body.
+    start, end = match.groups()
+    if start == '':
+        if end == '':
+            return None
+        length = min(int(end), size)
+        start, end = size - length, size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _stream(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = complaint_image_storage.path(path)
+    except SuspiciousFileOperation:
+        raise Http404
+    allowed, public = _access(request, path)
+    if not allowed or not os.path.isfile(full_path):
+        raise Http404
+
+    stat = os.stat(full_path)
+    etag = '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+    last_modified = int(stat.st_mtime)
+    content_type = INLINE_TYPES.get(os.path.splitext(full_path)[1].lower())
+    inline = content_type is not None
+    if not inline:
+        content_type = 'application/octet-stream'
+
+    def finish(response):
+        if not inline:
+            response['Content-Disposition'] = 'attachment'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        if public:
+            patch_cache_control(response, public=True, max_age=MUTABLE_MAX_AGE)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return finish(not_modified)
+
+    if SERVE_MODE in ('x-accel', 'x-sendfile'):
+        # The proxy sends the bytes and handles Range itself.
+        response = HttpResponse(content_type=content_type)
+        if SERVE_MODE == 'x-accel':
+            response['X-Accel-Redirect'] = ACCEL_PREFIX.rstrip('/') + '/' + path
+        else:
+            response['X-Sendfile'] = full_path
+        return finish(response)
+
+    byte_range = _byte_range(request, stat.st_size, etag, last_modified)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return finish(response)
+    if byte_range is None:
+        start, end, status = 0, stat.st_size - 1, 200
+    else:
+        (start, end), status = byte_range, 206
+
+    length = end - start + 1
+    body = _stream(full_path, start, length) if request.method == 'GET' else iter(())
+    response = StreamingHttpResponse(body, status=status, content_type=content_type)
+    response['Content-Length'] = str(length)
+    if status == 206:
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    return finish(response)
@@ -0,0 +1,54 @@
+# Generated by Django 3.2 on 2026-10-18 14:34
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count_subquery(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(complaint=OuterRef('pk'))
+            .order_by()
+            .values('complaint')
+            .annotate(n=Count('pk'))
+            .values('n'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def populate_counters(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    Complaint.objects.update(
+        likes_count=_count_subquery(apps.get_model('complaints', 'Like')),
+        comments_count=_count_subquery(apps.get_model('complaints', 'Comment')),
+        reports_count=_count_subquery(apps.get_model('complaints', 'Report')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0004_auto_20250805_2114'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='reports_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2 on 2026-10-18 14:36
+
+from django.db import migrations, models
+
+
+def populate_search_documents(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    batch = []
+    for complaint in Complaint.objects.select_related('category', 'ward', 'municipality').iterator():
+        parts = [complaint.title, complaint.description]
+        if complaint.category:
+            parts.append(complaint.category.category_name)
+        if complaint.ward:
+            parts.append(f"ward {complaint.ward.ward_number}")
+        if complaint.municipality:
+            parts.append(complaint.municipality.name)
+        complaint.search_document = '\n'.join(part for part in parts if part)
+        batch.append(complaint)
+        if len(batch) >= 500:
+            Complaint.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['search_document'])
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX complaints_complaint_search_ft '
+            'ON complaints_complaint (search_document)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE complaints_complaint_fts USING fts5(search_document)'
+        )
+        schema_editor.execute(
+            'INSERT INTO complaints_complaint_fts (rowid, search_document) '
+            'SELECT id, search_document FROM complaints_complaint'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute('DROP INDEX complaints_complaint_search_ft ON complaints_complaint')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS complaints_complaint_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0005_complaint_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
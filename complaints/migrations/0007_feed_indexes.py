@@ -0,0 +1,37 @@
+# Generated by Django 3.2 on 2026-10-18 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0006_complaint_search_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['complaint', 'created_at'], name='comment_complaint_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['created_at', 'id'], name='complaint_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['is_hidden', 'created_at', 'id'], name='complaint_visible_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['ward', 'created_at', 'id'], name='complaint_ward_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='complaint_user_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['ward', 'is_hidden', 'status'], name='complaint_ward_status_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0007_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='has_thumbnails',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
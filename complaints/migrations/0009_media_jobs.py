@@ -0,0 +1,42 @@
+# Generated by Django 3.2 on 2026-10-18 14:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0008_complaint_has_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='image_processing',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_name', models.CharField(max_length=255)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('dead', 'Dead')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media_jobs', to='complaints.complaint')),
+            ],
+            options={
+                'ordering': ['run_after', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='mediajob',
+            index=models.Index(fields=['state', 'run_after'], name='mediajob_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-18 14:47
+
+import complaints.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_blobs(apps, schema_editor):
+    # Existing uploads keep their names; they are simply reference counted.
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ImageBlob = apps.get_model('complaints', 'ImageBlob')
+    rows = (
+        Complaint.objects.exclude(image='').exclude(image__isnull=True)
+        .order_by().values('image').annotate(n=Count('pk'))
+    )
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=row['image'], refcount=row['n']) for row in rows],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_media_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='complaint',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=complaints.storage.ContentAddressedStorage(), upload_to='complaints/'),
+        ),
+        migrations.RunPython(populate_blobs, migrations.RunPython.noop),
+    ]
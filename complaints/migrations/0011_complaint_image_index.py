@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_image_blobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['image'], name='complaint_image_idx'),
+        ),
+    ]
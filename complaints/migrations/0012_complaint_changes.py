@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-18 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_complaint_image_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('complaint_id', models.BigIntegerField()),
+                ('ward_id', models.BigIntegerField(blank=True, null=True)),
+                ('municipality_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='complaintchange',
+            index=models.Index(fields=['ward_id', 'id'], name='complaintchange_ward_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaintchange',
+            index=models.Index(fields=['municipality_id', 'id'], name='complaintchange_muni_idx'),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Value
+from django.utils import timezone
 from django.utils.text import slugify
 from django.contrib.auth import get_user_model
 
+from .storage import complaint_image_storage
+
 
 User = get_user_model()
 
@@ -47,6 +51,30 @@ class Status(models.Model):
         return self.name
     
 
+class ComplaintQuerySet(models.QuerySet):
+
+    def visible_to(self, user):
+        # Hidden (reported) complaints are only shown to admins.
+        if user.is_authenticated and user.user_type == 'admin':
+            return self
+        return self.filter(is_hidden=False)
+
+    def for_feed(self, viewer=None):
+        # Everything a complaint card renders, in a single query: the related
+        # rows are joined, engagement counts come from the stored counters and
+        # the viewer's like/report state is resolved with EXISTS subqueries.
+        qs = self.select_related('user', 'status', 'category', 'municipality', 'ward__municipality')
+        if viewer is not None and viewer.is_authenticated:
+            return qs.annotate(
+                viewer_has_liked=Exists(Like.objects.filter(complaint=OuterRef('pk'), user=viewer)),
+                viewer_has_reported=Exists(Report.objects.filter(complaint=OuterRef('pk'), user=viewer)),
+            )
+        return qs.annotate(
+            viewer_has_liked=Value(False, output_field=models.BooleanField()),
+            viewer_has_reported=Value(False, output_field=models.BooleanField()),
+        )
+
+
 class Complaint(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
@@ -55,25 +83,101 @@ class Complaint(models.Model):
     municipality = models.ForeignKey(Municipality, on_delete=models.SET_NULL, null=True)
     ward = models.ForeignKey(Ward, on_delete=models.SET_NULL, null=True, blank=True)
     status = models.ForeignKey(Status, on_delete=models.SET_NULL, null=True)
-    image = models.ImageField(upload_to='complaints/', blank=True, null=True)
+    image = models.ImageField(upload_to='complaints/', storage=complaint_image_storage, blank=True, null=True)
+    # Set once the resized copies from complaints.images exist for `image`.
+    has_thumbnails = models.BooleanField(default=False, editable=False)
+    # True while a MediaJob for the current image is queued or running.
+    image_processing = models.BooleanField(default=False, editable=False)
     is_hidden = models.BooleanField(default=False)  
+    # Denormalized engagement counters, kept in sync by the views and
+    # repaired in bulk by the `recount_complaint_counters` command.
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    reports_count = models.PositiveIntegerField(default=0)
+    # Flattened text of the complaint and its category/location, indexed by
+    # the full-text engine in complaints.search.
+    search_document = models.TextField(blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ComplaintQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        # Every feed is a keyset scan on (created_at, id) behind one of these
+        # equality prefixes; see the check_query_plans command.
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='complaint_feed_idx'),
+            models.Index(fields=['is_hidden', 'created_at', 'id'], name='complaint_visible_feed_idx'),
+            models.Index(fields=['ward', 'created_at', 'id'], name='complaint_ward_feed_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='complaint_user_feed_idx'),
+            models.Index(fields=['ward', 'is_hidden', 'status'], name='complaint_ward_status_idx'),
+            # Media requests are authorized by looking the image up.
+            models.Index(fields=['image'], name='complaint_image_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+    SEARCH_SOURCE_FIELDS = {'title', 'description', 'category', 'ward', 'municipality'}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the row as loaded so post_save receivers can tell what
+        # actually changed (status, ward, visibility, ...).
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def loaded_value(self, attname, default=None):
+        return getattr(self, '_loaded_values', {}).get(attname, default)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.search_document = self.build_search_document()
+        elif self.SEARCH_SOURCE_FIELDS.intersection(update_fields):
+            self.search_document = self.build_search_document()
+            kwargs['update_fields'] = set(update_fields) | {'search_document'}
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def build_search_document(self):
+        parts = [self.title, self.description]
+        if self.category_id:
+            parts.append(self.category.category_name)
+        if self.ward_id:
+            parts.append(f"ward {self.ward.ward_number}")
+        if self.municipality_id:
+            parts.append(self.municipality.name)
+        return '\n'.join(part for part in parts if part)
     
     def report_count(self):
-        return self.reports.count()
+        return self.reports_count
 
     def like_count(self):
-        return self.likes.count()
+        return self.likes_count
 
     def comment_count(self):
-        return self.comments.count()
+        return self.comments_count
+
+    @classmethod
+    def adjust_counters(cls, pk, likes=0, comments=0, reports=0):
+        # Single UPDATE with F() expressions so concurrent requests never
+        # overwrite each other's increments.
+        changes = {}
+        if likes:
+            changes['likes_count'] = F('likes_count') + likes
+        if comments:
+            changes['comments_count'] = F('comments_count') + comments
+        if reports:
+            changes['reports_count'] = F('reports_count') + reports
+        if changes:
+            cls.objects.filter(pk=pk).update(**changes)
 
 class Like(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -91,6 +195,7 @@ class Comment(models.Model):
 
     class Meta:
         unique_together = ('user', 'complaint')
+        indexes = [models.Index(fields=['complaint', 'created_at'], name='comment_complaint_created_idx')]
 
 
 class Report(models.Model):
@@ -98,4 +203,68 @@ class Report(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='reports')
 
     class Meta:
-        unique_together = ('user', 'complaint')
\ No newline at end of file
+        unique_together = ('user', 'complaint')
+
+
+class MediaJob(models.Model):
+    """Image post-processing queued by the views and run by `process_media_jobs`."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    DEAD = 'dead'
+    STATE_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (DEAD, 'Dead'),
+    )
+
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='media_jobs')
+    # The image the job was queued for; a later upload makes the job obsolete.
+    image_name = models.CharField(max_length=255)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [models.Index(fields=['state', 'run_after'], name='mediajob_queue_idx')]
+
+    def __str__(self):
+        return f"{self.image_name} ({self.state})"
+
+
+class ImageBlob(models.Model):
+    """A stored image file and the number of complaints that reference it."""
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class ComplaintChange(models.Model):
+    """
+    Append-only log of complaint changes, read in id order by the delta
+    sync API (complaints.sync). Plain ids rather than foreign keys, so the
+    rows outlive the complaint and serve as tombstones.
+    """
+    complaint_id = models.BigIntegerField()
+    ward_id = models.BigIntegerField(null=True, blank=True)
+    municipality_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['ward_id', 'id'], name='complaintchange_ward_idx'),
+            models.Index(fields=['municipality_id', 'id'], name='complaintchange_muni_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} complaint {self.complaint_id}"
@@ -0,0 +1,180 @@
+import hashlib
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.encoding import force_bytes
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+COUNT_CACHE_TIMEOUT = 60
+
+
+def encode_cursor(values, direction):
+    # Datetimes keep their full microsecond precision; the keyset comparison
+    # must match the stored value exactly.
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    payload = json.dumps({'v': values, 'd': direction})
+    return urlsafe_base64_encode(force_bytes(payload))
+
+
+def decode_cursor(token):
+    try:
+        data = json.loads(urlsafe_base64_decode(token))
+        values, direction = data['v'], data['d']
+    except (TypeError, ValueError, KeyError):
+        return None, None
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        return None, None
+    return values, direction
+
+
+def approximate_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    # An unfiltered MySQL table can use the InnoDB row estimate; anything
+    # else is counted once and cached briefly, so paging never re-counts.
+    connection = connections[queryset.db]
+    if connection.vendor == 'mysql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] is not None:
+            return row[0]
+
+    count_qs = queryset.order_by().values('pk')
+    try:
+        sql, params = count_qs.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'paginator-count:' + hashlib.md5(force_bytes(sql + repr(params))).hexdigest()
+    return cache.get_or_set(key, count_qs.count, timeout)
+
+
+class CursorPage(Sequence):
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return '<CursorPage of %d items>' % len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor(self.paginator.cursor_values(self.object_list[-1]), 'next')
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return encode_cursor(self.paginator.cursor_values(self.object_list[0]), 'prev')
+
+
+class CursorPaginator:
+    """
+    Keyset pagination over a unique ordering (by default ``created_at`` then
+    ``id``, newest first). Each page is a single indexed range query of
+    ``per_page + 1`` rows, so page 500 costs the same as page 1.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'), with_count=True):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.with_count = with_count
+
+    @cached_property
+    def count(self):
+        if not self.with_count:
+            return None
+        return approximate_count(self.queryset)
+
+    def cursor_values(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def _coerce(self, values):
+        """The cursor values as their ordering fields' types, or None if any is invalid."""
+        if len(values) != len(self.ordering):
+            return None
+        annotations = self.queryset.query.annotations
+        coerced = []
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            if value is None or isinstance(value, (dict, list)):
+                return None
+            try:
+                if name in annotations:
+                    model_field = annotations[name].output_field
+                else:
+                    model_field = self.queryset.model._meta.get_field(name)
+                value = model_field.to_python(value)
+            except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+                return None
+            if isinstance(value, datetime) and timezone.is_naive(value):
+                return None
+            coerced.append(value)
+        return coerced
+
+    def _keyset_filter(self, values, forward):
+        # (a, b) after (x, y) == a > x OR (a = x AND b > y), with the
+        # comparison flipped for descending fields and for backward paging.
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= Q(**equal, **{'%s__%s' % (name, lookup): value})
+            equal[name] = value
+        return condition
+
+    def get_page(self, cursor=None):
+        # A token is client input: anything that does not decode to valid
+        # values for the ordering fields falls back to the first page.
+        values, direction = decode_cursor(cursor) if cursor else (None, None)
+        if values is not None:
+            values = self._coerce(values)
+
+        if values is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, len(rows) > self.per_page, False)
+
+        if direction == 'next':
+            qs = self.queryset.filter(self._keyset_filter(values, True)).order_by(*self.ordering)
+            rows = list(qs[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, len(rows) > self.per_page, True)
+
+        reverse = [f[1:] if f.startswith('-') else '-' + f for f in self.ordering]
+        qs = self.queryset.filter(self._keyset_filter(values, False)).order_by(*reverse)
+        rows = list(qs[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, self, True, has_previous)
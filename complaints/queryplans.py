@@ -0,0 +1,229 @@
+"""
+Query plan checks for the complaint views.
+
+``view_query_plans`` requests each view through the test client, page one
+and then the keyset page after it, and EXPLAINs every complaint query the
+view actually ran. A plan fails on a full scan or a sort, with two
+exceptions. Joins to the lookup tables (categories, statuses, wards,
+municipalities) may be scanned: they are a few hundred rows at most and
+the optimizer rightly reads them whole. Ranked search results may be
+sorted, since relevance is computed per match. The check_query_plans
+command and the tests in complaints/tests.py share this module.
+"""
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Category, Comment, Complaint, Like, Municipality, Report, Status, Ward
+from .search import refresh_search_documents
+
+User = get_user_model()
+
+LOOKUP_TABLES = {model._meta.db_table for model in (Category, Municipality, Status, Ward)}
+CHECKED_TABLES = ('complaints_complaint', 'complaints_comment', 'complaints_like', 'complaints_report')
+
+# (name, viewer role, url, ranked search)
+VIEWS = [
+    ('all_complaints', 'user', lambda c: reverse('all_complaints'), False),
+    ('search (visible feed)', 'user', lambda c: reverse('search'), False),
+    ('search (ranked)', 'user', lambda c: reverse('search') + '?q=plan+check', True),
+    ('my_complaints', 'user', lambda c: reverse('my_complaints'), False),
+    ('post_detail', 'user', lambda c: reverse('post_detail', args=[c.pk]), False),
+    ('municipality_dashboard', 'municipality', lambda c: reverse('municipality_dashboard'), False),
+    ('admin_dashboard', 'admin', lambda c: reverse('admin_dashboard'), False),
+    ('reported_complaints', 'admin', lambda c: reverse('reported_complaints'), False),
+    ('admin_search (ranked)', 'admin', lambda c: reverse('admin_search') + '?q=plan+check', True),
+    ('api complaint_list', 'user', lambda c: reverse('api_complaint_list'), False),
+]
+
+_ALIAS_RE = re.compile(r'JOIN [`"]?(\w+)[`"]? (?:AS )?[`"]?(T\d+)[`"]?')
+
+
+def _aliases(sql):
+    return {alias: table for table, alias in _ALIAS_RE.findall(sql)}
+
+
+def _is_lookup(table, aliases):
+    return aliases.get(table, table) in LOOKUP_TABLES
+
+
+def _mysql_problems(node, aliases, problems):
+    if isinstance(node, dict):
+        table = node.get('table_name')
+        if node.get('access_type') == 'ALL' and not _is_lookup(table, aliases):
+            problems.append(f'full scan of {table}')
+        if node.get('using_filesort'):
+            problems.append('filesort')
+        for value in node.values():
+            _mysql_problems(value, aliases, problems)
+    elif isinstance(node, list):
+        for value in node:
+            _mysql_problems(value, aliases, problems)
+    return problems
+
+
+def _sqlite_problems(plan, aliases):
+    problems = []
+    for line in plan.splitlines():
+        scan = re.search(r'\bSCAN (\S+)(.*)', line)
+        # "VIRTUAL TABLE INDEX" is a lookup in the full-text index.
+        indexed = scan and ('USING' in scan.group(2) or 'VIRTUAL TABLE INDEX' in scan.group(2))
+        if scan and not indexed and not _is_lookup(scan.group(1), aliases):
+            problems.append(f'full scan of {scan.group(1)}')
+        if 'USE TEMP B-TREE FOR ORDER BY' in line:
+            problems.append('filesort')
+    return problems
+
+
+def explain(sql, params=None):
+    """``(plan, problems)`` for one SQL statement, e.g. as captured from a request."""
+    aliases = _aliases(sql)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN FORMAT=JSON ' + sql, params)
+            plan = cursor.fetchone()[0]
+            return plan, _mysql_problems(json.loads(plan), aliases, [])
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+            return plan, _sqlite_problems(plan, aliases)
+    return '', []
+
+
+def explain_queryset(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return explain(sql, params)
+
+
+def _checked(sql):
+    return sql.startswith('SELECT') and any(
+        re.search(rf'FROM [`"]?{table}[`"]?', sql) for table in CHECKED_TABLES
+    )
+
+
+def _next_page(response):
+    if response.get('Content-Type', '').startswith('application/json'):
+        return response.json().get('next')
+    page = response.context and response.context.get('complaints')
+    cursor = getattr(page, 'next_cursor', None)
+    if cursor:
+        separator = '&' if '?' in response.wsgi_request.get_full_path() else '?'
+        return response.wsgi_request.get_full_path() + f'{separator}cursor={cursor}'
+    return None
+
+
+def view_query_plans(viewers, complaint):
+    """
+    Yield ``(view name, sql, plan, problems)`` for every complaint query the
+    views run on their first two pages. ``viewers`` maps 'user',
+    'municipality' and 'admin' to logged-in-capable users. Needs the test
+    environment (``setup_test_environment``) for response contexts.
+    """
+    clients = {}
+    for role, user in viewers.items():
+        clients[role] = Client()
+        clients[role].force_login(user)
+
+    for name, role, url, ranked in VIEWS:
+        url = url(complaint)
+        for page in (1, 2):
+            if url is None:
+                break
+            with CaptureQueriesContext(connection) as queries:
+                response = clients[role].get(url)
+            if response.status_code != 200:
+                raise AssertionError(f'{name}: {url} returned {response.status_code}')
+            for query in queries.captured_queries:
+                if not _checked(query['sql']):
+                    continue
+                plan, problems = explain(query['sql'])
+                if ranked:
+                    problems = [problem for problem in problems if problem != 'filesort']
+                yield f'{name} (page {page})', query['sql'], plan, problems
+            url = _next_page(response)
+
+
+def viewers():
+    """``(viewers, complaint)`` for ``view_query_plans`` from the current data."""
+    found = {
+        'user': (
+            User.objects.filter(user_type='user', is_active=True)
+            .annotate(complaints=Count('complaint')).order_by('-complaints').first()
+        ),
+        'municipality': User.objects.filter(user_type='municipality', is_active=True, ward__isnull=False).first(),
+        'admin': User.objects.filter(user_type='admin', is_active=True).first(),
+    }
+    complaint = Complaint.objects.filter(is_hidden=False).order_by('pk').first()
+    if None in found.values() or complaint is None:
+        raise LookupError(
+            'Need an active user with complaints, a municipality user with a ward, '
+            'an admin and a visible complaint.'
+        )
+    return found, complaint
+
+
+def seed(count):
+    """Insert ``count`` synthetic complaints, plus the users and lookup rows they need."""
+    municipality, _ = Municipality.objects.get_or_create(name='Plan Check')
+    wards = [Ward.objects.get_or_create(municipality=municipality, ward_number=n)[0] for n in range(1, 21)]
+    statuses = [Status.objects.get_or_create(name=name)[0] for name in ('Pending', 'In Progress', 'Resolved')]
+    category, _ = Category.objects.get_or_create(category_name='Plan Check')
+
+    # A few complaints per user, as on the live site.
+    existing = User.objects.filter(email__startswith='plancheck').count()
+    User.objects.bulk_create(
+        [
+            User(
+                first_name='Plan', last_name='Check', username=f'plancheck{n}',
+                email=f'plancheck{n}@example.com', is_active=True,
+            )
+            for n in range(existing, max(count // 3, 50))
+        ],
+        batch_size=1000,
+    )
+    users = list(User.objects.filter(email__startswith='plancheck'))
+    for user_type, ward in (('municipality', wards[0]), ('admin', None)):
+        User.objects.get_or_create(
+            email=f'plancheck-{user_type}@example.com',
+            defaults={
+                'first_name': 'Plan', 'last_name': 'Check', 'username': f'plancheck-{user_type}',
+                'user_type': user_type, 'ward': ward, 'municipality': municipality, 'is_active': True,
+            },
+        )
+
+    first_new = Complaint.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    Complaint.objects.bulk_create(
+        [
+            Complaint(
+                # The first user gets enough for a second my_complaints page.
+                user=users[0] if n < 10 else users[n % len(users)],
+                title=f'Plan check {n}',
+                description='Synthetic complaint for query plan checks.',
+                category=category,
+                municipality=municipality,
+                ward=wards[n % len(wards)],
+                status=statuses[n % len(statuses)],
+                is_hidden=(n % 50 == 0),
+            )
+            for n in range(count)
+        ],
+        batch_size=1000,
+    )
+    # bulk_create skips the signals that fill the search index.
+    refresh_search_documents(Complaint.objects.filter(pk__gt=first_new))
+
+    with connection.cursor() as cursor:
+        # SQLite is left without statistics: it does not weigh LIMIT when
+        # costing an ORDER BY, so sqlite_stat1 from a synthetic data set
+        # makes it drive the feeds from the user table and sort, a plan
+        # MySQL does not pick.
+        if connection.vendor == 'mysql':
+            tables = [m._meta.db_table for m in (Complaint, Like, Report, Comment, Ward, Status, Category)]
+            cursor.execute('ANALYZE TABLE ' + ', '.join(tables))
+            cursor.fetchall()
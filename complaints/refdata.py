@@ -0,0 +1,129 @@
+"""
+In-process cache of the small lookup tables (wards, categories, statuses,
+municipalities).
+
+Each worker keeps its own copy and reloads it when the version stamp in
+the shared cache changes; any save or delete of these models bumps the
+stamp (see signals.py). With a per-process cache backend the stamp is not
+shared, so copies are also reloaded after ``MAX_AGE`` seconds.
+"""
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Category, Municipality, Status, Ward
+
+VERSION_KEY = 'complaints:refdata-version'
+MAX_AGE = 300
+
+Table = namedtuple('Table', 'all by_id by_name')
+
+_lock = threading.Lock()
+_state = {'version': None, 'loaded_at': 0.0, 'tables': None}
+
+
+def _load_table(queryset, name):
+    rows = list(queryset)
+    return Table(
+        all=rows,
+        by_id={row.pk: row for row in rows},
+        by_name={name(row): row for row in rows},
+    )
+
+
+def _load():
+    return {
+        'wards': _load_table(
+            Ward.objects.select_related('municipality').order_by('pk'),
+            lambda ward: (ward.municipality_id, ward.ward_number),
+        ),
+        'categories': _load_table(Category.objects.order_by('pk'), lambda c: c.category_name),
+        'statuses': _load_table(Status.objects.order_by('pk'), lambda s: s.name),
+        'municipalities': _load_table(Municipality.objects.order_by('pk'), lambda m: m.name),
+    }
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def _tables():
+    version = _current_version()
+    with _lock:
+        if _state['version'] != version or time.monotonic() - _state['loaded_at'] > MAX_AGE:
+            _state.update(tables=_load(), version=version, loaded_at=time.monotonic())
+        return _state['tables']
+
+
+def version():
+    """Stamp that changes whenever any of the tables is edited."""
+    return _current_version()
+
+
+def bump_version():
+    """Make every worker reload the tables once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def _lookup(table, pk):
+    try:
+        return _tables()[table].by_id.get(int(pk))
+    except (TypeError, ValueError):
+        return None
+
+
+def wards():
+    return _tables()['wards'].all
+
+
+def categories():
+    return _tables()['categories'].all
+
+
+def statuses():
+    return _tables()['statuses'].all
+
+
+def municipalities():
+    return _tables()['municipalities'].all
+
+
+def ward_by_id(pk):
+    return _lookup('wards', pk)
+
+
+def category_by_id(pk):
+    return _lookup('categories', pk)
+
+
+def status_by_id(pk):
+    return _lookup('statuses', pk)
+
+
+def municipality_by_id(pk):
+    return _lookup('municipalities', pk)
+
+
+def ward_by_number(municipality_id, ward_number):
+    return _tables()['wards'].by_name.get((municipality_id, ward_number))
+
+
+def category_by_name(name):
+    return _tables()['categories'].by_name.get(name)
+
+
+def status_by_name(name):
+    return _tables()['statuses'].by_name.get(name)
+
+
+def municipality_by_name(name):
+    return _tables()['municipalities'].by_name.get(name)
@@ -0,0 +1,147 @@
+"""
+Full-text search over complaints.
+
+Each complaint stores a flattened ``search_document`` (title, description,
+category, ward and municipality) which is indexed per backend:
+
+* MySQL: a FULLTEXT index, queried with MATCH ... AGAINST in boolean mode.
+* SQLite: an FTS5 side table keyed by complaint id, for local testing.
+* Anything else: a single-column icontains scan of the document.
+
+Every backend gives the same results: a complaint matches when each word
+of the query starts a word of its document ("pot" finds "pothole"). The
+MySQL index skips words shorter than ``innodb_ft_min_token_size``
+(``SEARCH_MIN_TOKEN_SIZE``) and stopwords, so those query words are
+matched with icontains on the document instead.
+
+Results are ranked by relevance and paged with the keyset paginator on
+``(search_rank, id)``.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .pagination import CursorPaginator
+
+FTS_TABLE = 'complaints_complaint_fts'
+RANK_ORDERING = ('-search_rank', '-id')
+
+MIN_TOKEN_SIZE = getattr(settings, 'SEARCH_MIN_TOKEN_SIZE', 3)
+# InnoDB's default full-text stopword list.
+MYSQL_STOPWORDS = {
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for',
+    'from', 'how', 'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the',
+    'this', 'to', 'was', 'what', 'when', 'where', 'who', 'will', 'with', 'und', 'www',
+}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(keyword):
+    return _TOKEN_RE.findall(keyword.lower())
+
+
+def mysql_boolean_query(tokens):
+    """``(against, leftover)``: a required prefix term per indexable token, and the rest."""
+    indexed = [t for t in tokens if len(t) >= MIN_TOKEN_SIZE and t not in MYSQL_STOPWORDS]
+    leftover = [t for t in tokens if t not in indexed]
+    return ' '.join(f'+{token}*' for token in indexed), leftover
+
+
+def search_complaints(queryset, keyword):
+    """Filter ``queryset`` to complaints matching ``keyword``, annotated with ``search_rank``."""
+    tokens = _tokens(keyword)
+    if not tokens:
+        # Still annotated: the paginator orders by search_rank.
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    # Bare numbers are ward lookups; they are shorter than the MySQL
+    # full-text minimum token size, so go through the ward join instead.
+    if len(tokens) == 1 and tokens[0].isdigit():
+        return queryset.filter(ward__ward_number=int(tokens[0])).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+    vendor = connections[queryset.db].vendor
+    table = queryset.model._meta.db_table
+
+    if vendor == 'mysql':
+        against, tokens = mysql_boolean_query(tokens)
+        if against:
+            match = f'MATCH ({table}.search_document) AGAINST (%s IN BOOLEAN MODE)'
+            queryset = queryset.filter(RawSQL(match, [against], output_field=BooleanField())).annotate(
+                search_rank=RawSQL(match, [against], output_field=FloatField())
+            )
+        else:
+            queryset = queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+        for token in tokens:
+            queryset = queryset.filter(search_document__icontains=token)
+        return queryset
+
+    if vendor == 'sqlite':
+        match = ' '.join('"%s"*' % token for token in tokens)
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id',
+            [match],
+            output_field=FloatField(),
+        )
+        matching = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        return queryset.filter(id__in=matching).annotate(search_rank=rank)
+
+    for token in tokens:
+        queryset = queryset.filter(search_document__icontains=token)
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def search_paginator(queryset, keyword, per_page):
+    """Paginator for a search view: relevance order when searching, newest first otherwise."""
+    if keyword:
+        return CursorPaginator(search_complaints(queryset, keyword), per_page, ordering=RANK_ORDERING)
+    return CursorPaginator(queryset, per_page)
+
+
+def index_complaint(complaint):
+    """Sync one complaint into the side index (only SQLite keeps one)."""
+    connection = connections[complaint._state.db or 'default']
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [complaint.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, search_document) VALUES (%s, %s)',
+            [complaint.pk, complaint.search_document],
+        )
+
+
+def unindex_complaint(complaint):
+    connection = connections[complaint._state.db or 'default']
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [complaint.pk])
+
+
+def refresh_search_documents(queryset, batch_size=500):
+    """Rebuild the stored documents (and side index) for ``queryset``."""
+    refreshed = 0
+    batch = []
+    for complaint in queryset.select_related('category', 'ward', 'municipality').iterator(chunk_size=batch_size):
+        complaint.search_document = complaint.build_search_document()
+        batch.append(complaint)
+        if len(batch) >= batch_size:
+            refreshed += _flush(queryset.model, batch)
+            batch = []
+    refreshed += _flush(queryset.model, batch)
+    return refreshed
+
+
+def _flush(model, batch):
+    if batch:
+        model.objects.bulk_update(batch, ['search_document'])
+        for complaint in batch:
+            index_complaint(complaint)
+    return len(batch)
@@ -0,0 +1,155 @@
+import threading
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import refdata
+from .caching import bump_complaints_generation
+from .storage import release, retain
+from .models import Category, Comment, Complaint, Like, Municipality, Report, Status, Ward
+from .search import index_complaint, refresh_search_documents, unindex_complaint
+from .sync import record_change
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'search_document' in update_fields:
+        index_complaint(instance)
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted(sender, instance, **kwargs):
+    unindex_complaint(instance)
+
+
+def _image_name(value):
+    return getattr(value, 'name', value) or None
+
+
+# Reference counts of the stored image blobs (see complaints.storage).
+@receiver(post_save, sender=Complaint)
+def complaint_image_saved(sender, instance, created, **kwargs):
+    old = None if created else _image_name(instance.loaded_value('image'))
+    new = _image_name(instance.image)
+    if old != new:
+        retain(new)
+        release(old)
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_image_deleted(sender, instance, **kwargs):
+    release(_image_name(instance.image))
+
+
+# Likes, comments and reports come off the stored counters whenever they
+# are deleted: from the views, the admin or a cascade (e.g. a deleted
+# user). Runs in the same transaction as the delete. Rows that go with
+# their complaint are skipped, since there is no counter left to adjust;
+# the collector sends every pre_delete before any post_delete.
+_deleting = threading.local()
+
+
+@receiver(pre_delete, sender=Complaint)
+def complaint_deleting(sender, instance, **kwargs):
+    if not hasattr(_deleting, 'pks'):
+        _deleting.pks = set()
+    _deleting.pks.add(instance.pk)
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted_counters(sender, instance, **kwargs):
+    getattr(_deleting, 'pks', set()).discard(instance.pk)
+
+
+def _take_off_counter(instance, counter):
+    if instance.complaint_id not in getattr(_deleting, 'pks', ()):
+        Complaint.adjust_counters(instance.complaint_id, **{counter: -1})
+
+
+@receiver(post_delete, sender=Like)
+def like_deleted(sender, instance, **kwargs):
+    _take_off_counter(instance, 'likes')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    _take_off_counter(instance, 'comments')
+
+
+@receiver(post_delete, sender=Report)
+def report_deleted(sender, instance, **kwargs):
+    _take_off_counter(instance, 'reports')
+
+
+# Renaming a category, ward or municipality changes the documents of every
+# complaint filed under it.
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(Complaint.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=Ward)
+def ward_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(Complaint.objects.filter(ward=instance))
+
+
+@receiver(post_save, sender=Municipality)
+def municipality_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(Complaint.objects.filter(municipality=instance))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Ward)
+@receiver(post_save, sender=Status)
+@receiver(post_save, sender=Municipality)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Ward)
+@receiver(post_delete, sender=Status)
+@receiver(post_delete, sender=Municipality)
+def reference_data_changed(sender, **kwargs):
+    refdata.bump_version()
+    bump_complaints_generation()
+
+
+# Anything a complaint card shows, apart from the engagement counters.
+DISPLAYED_FIELDS = (
+    'title', 'description', 'image', 'is_hidden', 'status_id', 'ward_id', 'category_id', 'municipality_id',
+)
+
+
+def _displayed_fields_changed(instance, created):
+    if created or not hasattr(instance, '_loaded_values'):
+        return True
+    for field in DISPLAYED_FIELDS:
+        old, new = instance.loaded_value(field), getattr(instance, field)
+        if field == 'image':
+            old, new = _image_name(old), _image_name(new)
+        if old != new:
+            return True
+    return False
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_changed_generation(sender, instance, created, **kwargs):
+    if _displayed_fields_changed(instance, created):
+        bump_complaints_generation()
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted_generation(sender, instance, **kwargs):
+    bump_complaints_generation()
+
+
+# Change log for the delta sync API (see complaints.sync).
+@receiver(post_save, sender=Complaint)
+def complaint_changed_sync(sender, instance, created, **kwargs):
+    if _displayed_fields_changed(instance, created):
+        record_change(instance)
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted_sync(sender, instance, **kwargs):
+    record_change(instance)
@@ -0,0 +1,154 @@
+"""
+Content-addressed storage for complaint images.
+
+Files are named by the SHA-256 of their bytes and sharded into two levels
+of subdirectories (``complaints/ab/cd/abcd....jpg``), so identical uploads
+share one file. The extension comes from the image format in the file's
+header, never from the name the client sent. ``ImageBlob`` rows count how
+many complaints reference each file; when the count drops to zero the
+file and its derivatives are deleted after the transaction commits.
+
+An upload whose file already exists skips the write, so the upload and
+the collector both go through the blob row under ``select_for_update``:
+the upload locks (or creates) the row before looking at the file and
+holds the lock until its transaction, which also saves the complaint,
+commits. The collector re-checks the count under the same lock before
+deleting anything. Uploads have to run inside ``transaction.atomic()``
+for the lock to last until the complaint references the file.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+from .uploads import image_extension
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        ext = image_extension(content)
+        if ext is None:
+            raise SuspiciousFileOperation(f'{name!r} is not a supported image.')
+        digest = content_digest(content)
+        directory = posixpath.dirname(name)
+        name = posixpath.join(directory, digest[:2], digest[2:4], digest + ext)
+        return self._save(name, content)
+
+    def _save(self, name, content):
+        _lock_blob(name)
+        # Same name means same bytes: an existing file is already correct.
+        if self.exists(name):
+            return name
+        return _write_atomic(self, name, content)
+
+    @cached_property
+    def derivative_storage(self):
+        return OverwritingStorage(location=self.location, base_url=self.base_url)
+
+
+@deconstructible
+class OverwritingStorage(FileSystemStorage):
+    """Saves under exactly the given name, atomically replacing any existing file."""
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        return _write_atomic(self, name, content)
+
+
+def _write_atomic(storage, name, content):
+    full_path = storage.path(name)
+    directory = os.path.dirname(full_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in content.chunks():
+                out.write(chunk)
+        if storage.file_permissions_mode is not None:
+            os.chmod(tmp_path, storage.file_permissions_mode)
+        # Atomic, so concurrent writers of the same name never clash.
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return name
+
+
+complaint_image_storage = ContentAddressedStorage()
+
+
+def _lock_blob(name):
+    """Lock the blob row for ``name``, creating it unreferenced if needed."""
+    from .models import ImageBlob
+
+    with transaction.atomic():
+        ImageBlob.objects.select_for_update().get_or_create(name=name, defaults={'refcount': 0})
+
+
+def retain(name):
+    """Count one more complaint referencing the stored image ``name``."""
+    from .models import ImageBlob
+
+    if not name:
+        return
+    if ImageBlob.objects.filter(name=name).update(refcount=F('refcount') + 1):
+        return
+    _, created = ImageBlob.objects.get_or_create(name=name, defaults={'refcount': 1})
+    if not created:
+        ImageBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def release(name):
+    """Drop one reference to ``name``; collect the blob once nothing uses it."""
+    from .models import ImageBlob
+
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+    if ImageBlob.objects.filter(name=name, refcount=0).exists():
+        transaction.on_commit(lambda: collect_file(name))
+
+
+def collect_file(name):
+    """Delete the unreferenced blob ``name`` with its file and derivatives."""
+    from .images import delete_derivatives
+    from .models import ImageBlob
+
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update().filter(name=name).first()
+        # No row: already collected, and anything newer is an upload's to keep.
+        # A count above zero: a new upload of the same bytes revived it.
+        if blob is None or blob.refcount > 0:
+            return
+        blob.delete()
+        if complaint_image_storage.exists(name):
+            complaint_image_storage.delete(name)
+        delete_derivatives(complaint_image_storage.derivative_storage, name)
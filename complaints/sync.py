@@ -0,0 +1,112 @@
+"""
+"Changes since token" feed for offline clients.
+
+Every save that changes what a client shows (see ``DISPLAYED_FIELDS`` in
+signals.py) and every delete appends a ``ComplaintChange`` row for the
+complaint's ward and municipality. A complaint that moves gets a row for
+its old ward and municipality as well. A sync reads the rows after the
+client's token with an index range scan on ``(ward_id, id)`` or
+``(municipality_id, id)``. It then loads the current state of just those
+complaints. Anything no longer visible in the scope (deleted, hidden or
+moved away) is reported as a tombstone.
+
+Ids are handed out at insert time, but transactions can commit out of id
+order. Rows younger than ``SETTLE_SECONDS`` are therefore left for the
+next sync. This is a heuristic, not a guarantee: a transaction that
+commits more than ``SETTLE_SECONDS`` after it wrote its change row can
+still land behind a token that has already moved on, and that change is
+only picked up when the client reloads the list. The request
+transactions that write changes are short. Raise the setting if
+longer-running writers (bulk commands, migrations) touch complaints.
+
+Tokens expire after ``RETENTION_DAYS``; the ``prune_complaint_changes``
+command deletes rows that no unexpired token can still need.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ComplaintChange
+
+# Longer than the request transactions that write changes; see above.
+SETTLE_SECONDS = getattr(settings, 'COMPLAINT_SYNC_SETTLE_SECONDS', 5)
+TOKEN_SALT = 'complaints.sync'
+SCOPES = ('ward', 'municipality')
+RETENTION_DAYS = getattr(settings, 'COMPLAINT_SYNC_RETENTION_DAYS', 30)
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenExpired(InvalidToken):
+    pass
+
+
+def record_change(complaint):
+    scopes = {(complaint.ward_id, complaint.municipality_id)}
+    if hasattr(complaint, '_loaded_values'):
+        scopes.add((complaint.loaded_value('ward_id'), complaint.loaded_value('municipality_id')))
+    ComplaintChange.objects.bulk_create([
+        ComplaintChange(complaint_id=complaint.pk, ward_id=ward_id, municipality_id=municipality_id)
+        for ward_id, municipality_id in scopes
+    ])
+
+
+def make_token(scope, scope_id, sequence):
+    return signing.dumps([scope, scope_id, sequence], salt=TOKEN_SALT, compress=True)
+
+
+def read_token(token, scope, scope_id):
+    """The sequence number in ``token``; raises InvalidToken."""
+    try:
+        token_scope, token_scope_id, sequence = signing.loads(
+            token, salt=TOKEN_SALT, max_age=timedelta(days=RETENTION_DAYS)
+        )
+    except signing.SignatureExpired:
+        raise TokenExpired('The sync token has expired; reload the complaint list.')
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidToken('Invalid sync token.')
+    if (token_scope, token_scope_id) != (scope, scope_id) or not isinstance(sequence, int):
+        raise InvalidToken('The sync token belongs to a different scope.')
+    return sequence
+
+
+def _settled(scope, scope_id):
+    cutoff = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    return ComplaintChange.objects.filter(**{f'{scope}_id': scope_id}, created_at__lte=cutoff)
+
+
+def head(scope, scope_id):
+    """Sequence number of the newest settled change in the scope (0 if none)."""
+    return _settled(scope, scope_id).aggregate(head=Max('id'))['head'] or 0
+
+
+def changes_since(scope, scope_id, sequence, limit):
+    """
+    ``(complaint_ids, new_sequence, has_more)`` for at most ``limit``
+    change rows after ``sequence``, oldest first; ids are de-duplicated.
+    """
+    rows = list(
+        _settled(scope, scope_id).filter(id__gt=sequence)
+        .order_by('id').values_list('id', 'complaint_id')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    complaint_ids = list(dict.fromkeys(complaint_id for _, complaint_id in rows))
+    return complaint_ids, (rows[-1][0] if rows else sequence), has_more
+
+
+def prune(batch_size=5000):
+    """Delete change rows older than any unexpired token can need; returns the count."""
+    # One extra day covers the settle window and long-running transactions.
+    cutoff = timezone.now() - timedelta(days=RETENTION_DAYS + 1)
+    deleted = 0
+    while True:
+        ids = list(ComplaintChange.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += ComplaintChange.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,37 @@
+from django import template
+
+from complaints import refdata
+from complaints.images import derivative_url
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    # Keep the current filters/search terms and swap in the new cursor.
+    params = context['request'].GET.copy()
+    params.pop('page', None)
+    params['cursor'] = cursor
+    return '?' + params.urlencode()
+
+
+@register.inclusion_tag('includes/complaint_picture.html')
+def complaint_picture(complaint, size, css_class='', alt='', style=''):
+    # Resized WebP with a JPEG fallback once the derivatives exist; the
+    # original upload until then.
+    image = complaint.image
+    context = {
+        'css_class': css_class, 'alt': alt, 'style': style, 'webp': None, 'src': image.url,
+        'processing': complaint.image_processing,
+    }
+    if complaint.has_thumbnails:
+        context['webp'] = derivative_url(image, size, 'webp')
+        context['src'] = derivative_url(image, size, 'jpg')
+    return context
+
+
+@register.simple_tag
+def refdata_version():
+    # Part of the card fragment cache key: cards show ward, category and
+    # status names, which can be renamed without touching the complaint.
+    return refdata.version()
@@ -1,3 +1,162 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.contrib.auth import get_user_model
+from django.core.exceptions import SuspiciousFileOperation
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from . import queryplans
+from .models import Comment, Complaint, ImageBlob, Like
+from .search import mysql_boolean_query, search_complaints
+from .storage import collect_file, complaint_image_storage, release, retain
+
+
+class QueryPlanTests(TestCase):
+    """The views' queries stay on the indexes (see complaints.queryplans)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        queryplans.seed(300)
+
+    def test_view_queries_use_indexes(self):
+        viewers, complaint = queryplans.viewers()
+        checked = set()
+        for name, sql, plan, problems in queryplans.view_query_plans(viewers, complaint):
+            checked.add(name)
+            with self.subTest(name):
+                self.assertEqual(problems, [], f'{sql}\n{plan}')
+        # Keyset pages were followed, not just the first page.
+        self.assertIn('all_complaints (page 2)', checked)
+        self.assertIn('my_complaints (page 2)', checked)
+        self.assertIn('search (ranked) (page 2)', checked)
+
+    def test_lookup_table_scans_are_allowed(self):
+        queryset = Complaint.objects.select_related('status', 'category', 'ward__municipality').order_by('-created_at', '-id')
+        _, problems = queryplans.explain_queryset(queryset[:7])
+        self.assertEqual(problems, [])
+
+    def test_unindexed_query_is_reported(self):
+        _, problems = queryplans.explain_queryset(Complaint.objects.filter(title='x').order_by('description'))
+        self.assertIn('full scan of complaints_complaint', problems)
+        self.assertIn('filesort', problems)
+
+
+class ImageBlobTests(TestCase):
+    """Shared image files are only deleted once nothing references them."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), (200, 50, 50)).save(buffer, 'JPEG')
+        self.photo = buffer.getvalue()
+
+    def test_extension_comes_from_the_image_format(self):
+        name = complaint_image_storage.save('complaints/evil.html', ContentFile(self.photo))
+        self.assertTrue(name.endswith('.jpg'))
+        with self.assertRaises(SuspiciousFileOperation):
+            complaint_image_storage.save('complaints/page.jpg', ContentFile(b'<html></html>'))
+
+    def test_unreferenced_blob_is_collected(self):
+        name = complaint_image_storage.save('complaints/a.jpg', ContentFile(self.photo))
+        retain(name)
+        release(name)
+        collect_file(name)
+        self.assertFalse(complaint_image_storage.exists(name))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_upload_revives_released_blob(self):
+        name = complaint_image_storage.save('complaints/a.jpg', ContentFile(self.photo))
+        retain(name)
+        release(name)
+        # The same bytes are uploaded again before the collector runs.
+        self.assertEqual(complaint_image_storage.save('complaints/b.jpg', ContentFile(self.photo)), name)
+        retain(name)
+        collect_file(name)
+        self.assertTrue(complaint_image_storage.exists(name))
+        self.assertEqual(ImageBlob.objects.get(name=name).refcount, 1)
+
+
+class MediaTests(TestCase):
+    """Complaint media is only rendered inline when it is an image type."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user('Media', 'Test', 'mediatest', 'media@example.com')
+
+    def _stored(self, name, content):
+        path = complaint_image_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        Complaint.objects.create(user=self.user, title='Media', description='d', image=name)
+        return '/media/' + name
+
+    def test_image_is_served_inline(self):
+        response = self.client.get(self._stored('complaints/ab/cd/' + 'abcd' * 16 + '.jpg', b'jpeg'))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertNotIn('Content-Disposition', response)
+
+    def test_other_types_are_downloaded(self):
+        response = self.client.get(self._stored('complaints/ab/cd/' + 'abcd' * 16 + '.html', b'<script></script>'))
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertEqual(response['Content-Disposition'], 'attachment')
+
+
+class SearchTests(TestCase):
+    """Search matches word prefixes, the same way on every backend."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user('Search', 'Test', 'searchtest', 'search@example.com')
+        cls.pothole = Complaint.objects.create(user=user, title='Pothole on the main road', description='Deep.')
+        Complaint.objects.create(user=user, title='Broken streetlight', description='Dark at night.')
+
+    def test_prefix_matches(self):
+        for keyword in ('pot', 'pothole', 'pot road', 'POT ma'):
+            with self.subTest(keyword):
+                self.assertEqual(list(search_complaints(Complaint.objects.all(), keyword)), [self.pothole])
+
+    def test_every_word_is_required(self):
+        self.assertEqual(list(search_complaints(Complaint.objects.all(), 'pot night')), [])
+
+    def test_mysql_query_requires_prefixes(self):
+        against, leftover = mysql_boolean_query(['pot', 'on', 'the', 'road'])
+        self.assertEqual(against, '+pot* +road*')
+        # Too short or a stopword: not in the FULLTEXT index, matched with icontains.
+        self.assertEqual(leftover, ['on', 'the'])
+
+
+class CounterTests(TestCase):
+    """Deleting likes and comments anywhere (views, admin, cascades) updates the counters."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.author = User.objects.create_user('Counter', 'Author', 'counterauthor', 'author@example.com')
+        self.other = User.objects.create_user('Counter', 'Other', 'counterother', 'other@example.com')
+        self.complaint = Complaint.objects.create(user=self.author, title='Counters', description='d')
+        Like.objects.create(user=self.other, complaint=self.complaint)
+        Comment.objects.create(user=self.other, complaint=self.complaint, content='c')
+        Complaint.adjust_counters(self.complaint.pk, likes=1, comments=1)
+
+    def test_queryset_delete_decrements(self):
+        # What the admin's delete_queryset does.
+        Comment.objects.filter(complaint=self.complaint).delete()
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.comments_count, 0)
+
+    def test_user_delete_decrements(self):
+        self.other.delete()
+        self.complaint.refresh_from_db()
+        self.assertEqual((self.complaint.likes_count, self.complaint.comments_count), (0, 0))
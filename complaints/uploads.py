@@ -0,0 +1,119 @@
+"""
+Memory-bounded handling of complaint photo uploads.
+
+``BoundedUploadHandler`` streams every uploaded file to a temporary file on
+disk and stops storing it once ``COMPLAINT_IMAGE_MAX_BYTES`` is exceeded, so
+a request never holds an upload in memory. ``prepare_complaint_image`` then
+inspects the image header (no pixel decode) to enforce the format and
+pixel limits, and shrinks photos larger than ``COMPLAINT_IMAGE_MAX_SIDE``
+using the JPEG decoder's reduced-size (draft) decoding. The peak memory for
+one upload is therefore bounded by the pixel limit, not by what the client
+sends.
+"""
+import os
+import warnings
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+MAX_BYTES = getattr(settings, 'COMPLAINT_IMAGE_MAX_BYTES', 15 * 1024 * 1024)
+# Header-declared width x height; 25 MP covers every phone camera while
+# bounding a full RGBA decode at ~100 MB.
+MAX_PIXELS = getattr(settings, 'COMPLAINT_IMAGE_MAX_PIXELS', 25_000_000)
+# Longest side kept for the stored original.
+MAX_SIDE = getattr(settings, 'COMPLAINT_IMAGE_MAX_SIDE', 2560)
+# Accepted formats and the extension each is stored under.
+IMAGE_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """Always spool to disk, and drop the bytes of any file over ``MAX_BYTES``."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > MAX_BYTES:
+            if not self.oversized:
+                # Keep reading the request body, but release what was stored.
+                self.oversized = True
+                self.file.truncate(0)
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(0 if self.oversized else file_size)
+        upload.oversized = self.oversized
+        return upload
+
+
+def _open_header(upload):
+    upload.seek(0)
+    with warnings.catch_warnings():
+        # Pillow only warns between MAX_IMAGE_PIXELS and twice that; treat
+        # every bomb warning as an error.
+        warnings.simplefilter('error', Image.DecompressionBombWarning)
+        try:
+            return Image.open(upload)
+        except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+            raise ValidationError('This image is too large to process.')
+        except OSError:
+            raise ValidationError('The uploaded file is not a supported image.')
+
+
+def image_extension(content):
+    """Extension for the image in ``content``, from its header; None if it is not an accepted image."""
+    content.seek(0)
+    try:
+        with Image.open(content) as image:
+            image_format = image.format
+    except (OSError, Image.DecompressionBombError):
+        image_format = None
+    content.seek(0)
+    return IMAGE_EXTENSIONS.get(image_format)
+
+
+def _downscale(image, name):
+    # draft() makes the JPEG decoder produce a 1/2, 1/4 or 1/8 scale image
+    # directly, so the full-size bitmap is never allocated.
+    image.draft('RGB', (MAX_SIDE, MAX_SIDE))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS, reducing_gap=3.0)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return SimpleUploadedFile(f'{stem}.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+def prepare_complaint_image(upload):
+    """
+    Validate an uploaded complaint photo and return the file to store: the
+    upload itself, or a downscaled JPEG copy. Raises ValidationError.
+    """
+    if getattr(upload, 'oversized', False) or upload.size > MAX_BYTES:
+        raise ValidationError(f'Images must be smaller than {filesizeformat(MAX_BYTES)}.')
+
+    image = _open_header(upload)
+    with image:
+        if image.format not in IMAGE_EXTENSIONS:
+            raise ValidationError('Please upload a JPEG, PNG, WebP or GIF image.')
+        width, height = image.size
+        if width * height > MAX_PIXELS:
+            raise ValidationError('This image has too many pixels; please upload a smaller photo.')
+        if max(width, height) <= MAX_SIDE:
+            upload.seek(0)
+            return upload
+        try:
+            return _downscale(image, upload.name)
+        except (OSError, Image.DecompressionBombError):
+            raise ValidationError('The uploaded file is not a supported image.')
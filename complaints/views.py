@@ -1,16 +1,28 @@
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import Complaint, Ward, Category, Status ,Like, Comment, Report
+from . import refdata
+from .engagement import set_like, set_report
+from .filters import ComplaintFilterForm, filter_paginator
+from .jobs import enqueue_image_processing
+from .uploads import prepare_complaint_image
+from .models import Complaint, Comment
+from .pagination import CursorPaginator
+from .search import search_paginator
 from django.contrib.auth import get_user_model
-from django.core.paginator import Paginator
-from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.views.decorators.http import require_POST
+from awaz.ratelimit import rate_limit
+from dashboard.stats import ward_status_counts
 
 
 
 User = get_user_model()
 
 @login_required(login_url='login')
+@rate_limit('post')
 def post_complaint(request):
     if request.method == 'POST':
         title = request.POST.get('title', '').strip()
@@ -24,43 +36,49 @@ def post_complaint(request):
             messages.error(request, "Please fill all required fields.")
             return redirect('post_complaint')
 
-        try:
-            ward = Ward.objects.get(id=ward_id)
-        except Ward.DoesNotExist:
+        ward = refdata.ward_by_id(ward_id)
+        if ward is None:
             messages.error(request, "Invalid ward selected.")
             return redirect('post_complaint')
 
-        try:
-            category = Category.objects.get(category_name=category_name)
-        except Category.DoesNotExist:
+        category = refdata.category_by_name(category_name)
+        if category is None:
             messages.error(request, "Invalid category selected.")
             return redirect('post_complaint')
 
-        try:
-            status = Status.objects.get(name='Pending')  # Default status
-        except Status.DoesNotExist:
+        status = refdata.status_by_name('Pending')  # Default status
+        if status is None:
             messages.error(request, "Default status not set in database.")
             return redirect('post_complaint')
 
-        # Save complaint
-        Complaint.objects.create(
-            user=request.user,
-            title=title,
-            description=description,
-            category=category,
-            municipality=ward.municipality, 
-            ward=ward,  
-            status=status,
-            image=image if image else None,
-        )
+        if image:
+            try:
+                image = prepare_complaint_image(image)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+                return redirect('post_complaint')
+
+        # Save complaint; image resizing is queued for the media worker
+        with transaction.atomic():
+            complaint = Complaint.objects.create(
+                user=request.user,
+                title=title,
+                description=description,
+                category=category,
+                municipality=ward.municipality, 
+                ward=ward,  
+                status=status,
+                image=image if image else None,
+            )
+            enqueue_image_processing(complaint)
 
         messages.success(request, "Complaint submitted successfully.")
         return redirect('my_complaints')
     
   
     # GET method: render form
-    wards = Ward.objects.select_related('municipality').all()
-    categories = Category.objects.all()
+    wards = refdata.wards()
+    categories = refdata.categories()
 
     return render(request, 'complaints/create_complaint.html', {
         'wards': wards,
@@ -70,18 +88,18 @@ def post_complaint(request):
 
 @login_required(login_url='login')
 def all_complaint(request):
-    complaints_list = Complaint.objects.all().order_by('-created_at') 
-    paginator = Paginator(complaints_list, 6)  # 6 complaints per page 
+    complaints_list = Complaint.objects.for_feed(request.user).order_by('-created_at') 
+    paginator = CursorPaginator(complaints_list, 6)  # 6 complaints per page 
 
-    page_number = request.GET.get('page')
+    page_number = request.GET.get('cursor')
     page_obj = paginator.get_page(page_number)
     post_count= paginator.count 
 
     context = {
         'complaints': page_obj, 
-        'wards':Ward.objects.all(),
-        'statuses': Status.objects.all(),
-        'links': Category.objects.all(),
+        'wards':refdata.wards(),
+        'statuses': refdata.statuses(),
+        'links': refdata.categories(),
         'post_count': post_count
     }
 
@@ -91,62 +109,46 @@ def all_complaint(request):
 @login_required(login_url='login')
 def post_detail(request, id):
     user = request.user
-    
-    if user.is_authenticated and user.user_type == 'admin':
-        
-        complaint = get_object_or_404(Complaint, id=id)
-    else:
-        complaint = get_object_or_404(Complaint, id=id, is_hidden=False)
+    complaint = get_object_or_404(Complaint.objects.for_feed(user).visible_to(user), id=id)
 
-    statuses = Status.objects.all()   
+    statuses = refdata.statuses()   
     return render(request, 'complaints/post_detail.html', {'complaint': complaint, 'statuses': statuses})
 
 
 @login_required(login_url='login')
 def search(request):
     
-    complaints = Complaint.objects.filter(is_hidden=False).order_by('-created_at')
-    post_count = 0
-    keyword = request.GET.get('q', '').strip().lower()
-    
-    if keyword:
-        complaints = complaints.filter(
-            Q(title__icontains=keyword) |
-            Q(description__icontains=keyword) |
-            Q(category__category_name__icontains=keyword) |
-            Q(ward__ward_number__icontains=keyword) |
-            Q(municipality__name__icontains=keyword)
-        ).order_by('-created_at').distinct()
-
-    post_count = complaints.count()
-
-    # Pagination
-    paginator = Paginator(complaints, 6)
-    page = request.GET.get('page')
+    complaints = Complaint.objects.for_feed(request.user).filter(is_hidden=False)
+    keyword = request.GET.get('q', '').strip()
+
+    # Relevance-ranked full-text search, paginated
+    paginator = search_paginator(complaints, keyword, 6)
+    page = request.GET.get('cursor')
     complaints = paginator.get_page(page)
+    post_count = paginator.count
 
     context = {
         'complaints': complaints,
         'post_count': post_count,
-        'links': Category.objects.all(),
-        'wards': Ward.objects.all(),
-        'statuses': Status.objects.all(),
+        'links': refdata.categories(),
+        'wards': refdata.wards(),
+        'statuses': refdata.statuses(),
     }
     return render(request, 'complaints/all_complaints.html', context)
 
 @login_required(login_url='login')
 def my_complaints(request):
-    complaints_list = Complaint.objects.filter(user=request.user).order_by('-created_at') 
-    paginator = Paginator(complaints_list, 6)
-    page_number = request.GET.get('page')
+    complaints_list = Complaint.objects.for_feed(request.user).filter(user=request.user).order_by('-created_at') 
+    paginator = CursorPaginator(complaints_list, 6)
+    page_number = request.GET.get('cursor')
     page_obj = paginator.get_page(page_number)
     post_count= paginator.count 
     
     context = {
         'complaints': page_obj, 
-        'wards': Ward.objects.all(),
-        'statuses': Status.objects.all(),
-        'links': Category.objects.all(),
+        'wards': refdata.wards(),
+        'statuses': refdata.statuses(),
+        'links': refdata.categories(),
         'post_count': post_count
     }
     return render(request, 'complaints/my_complaints.html', context)
@@ -156,7 +158,7 @@ def my_complaints(request):
 def my_profile(request):
     user = request.user
     post_count = Complaint.objects.filter(user=user).count()
-    total_count = Complaint.objects.filter(ward=user.ward ,is_hidden=False).count()
+    total_count = ward_status_counts(user.ward)['total_count']
      
     
     context = {
@@ -168,53 +170,61 @@ def my_profile(request):
 
 
 @login_required(login_url='login')
+@require_POST
+@rate_limit('like')
 def like_complaint(request, pk):
-    complaint = get_object_or_404(Complaint, pk=pk)
-
-    if request.user == complaint.user:
+    # action=like/unlike sets the state (safe to repeat); without it the
+    # like is toggled. Requests that accept JSON get the new count back
+    # instead of a redirect.
+    owner_id = Complaint.objects.filter(pk=pk).values_list('user_id', flat=True).first()
+    if owner_id is None:
+        raise Http404
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+
+    if owner_id == request.user.pk:
+        if wants_json:
+            return JsonResponse({'error': "You cannot like your own post."}, status=403)
         messages.error(request, "You cannot like your own post.")
-    else:
-        like_obj = Like.objects.filter(user=request.user, complaint=complaint).first()
-        if like_obj:
-            like_obj.delete()
-            messages.success(request, "You unliked the post.")
-        else:
-            Like.objects.create(user=request.user, complaint=complaint)
-            messages.success(request, "You liked the post.")
+        return redirect(request.META.get('HTTP_REFERER', 'home'))
+
+    action = request.POST.get('action', '')
+    if action not in ('', 'like', 'unlike'):
+        return HttpResponseBadRequest("Unknown action.")
+    liked, likes_count = set_like(request.user, pk, {'like': True, 'unlike': False}.get(action))
 
+    if wants_json:
+        return JsonResponse({'liked': liked, 'likes_count': likes_count})
+    messages.success(request, "You liked the post." if liked else "You unliked the post.")
     return redirect(request.META.get('HTTP_REFERER', 'home'))
 
 
 
 @login_required(login_url='login')
+@require_POST
+@rate_limit('report')
 def report_complaint(request, pk):
-    complaint = get_object_or_404(Complaint, pk=pk)
+    owner_id = Complaint.objects.filter(pk=pk).values_list('user_id', flat=True).first()
+    if owner_id is None:
+        raise Http404
 
-    if request.user == complaint.user:
+    if owner_id == request.user.pk:
         messages.error(request, "You cannot report your own post.")
     else:
-        report_obj = Report.objects.filter(user=request.user, complaint=complaint).first()
-        if report_obj:
-            report_obj.delete()
-            messages.success(request, "You have unreported this post.")
-            
-            # unhide if reports drop below 
-            if complaint.report_count() < 3 and complaint.is_hidden:
-                complaint.is_hidden = False
-                complaint.save()
-        else:
-            Report.objects.create(user=request.user, complaint=complaint)
+        reported, complaint = set_report(request.user, pk)
+        if complaint is None:
+            # Deleted since the owner lookup above.
+            raise Http404
+        if reported:
             messages.success(request, "You reported the post.")
-
-            if complaint.report_count() >= 3 and not complaint.is_hidden:
-                complaint.is_hidden = True
-                complaint.save()
+        else:
+            messages.success(request, "You have unreported this post.")
 
     return redirect(request.META.get('HTTP_REFERER', 'home'))
 
 
 
 @login_required(login_url='login')
+@rate_limit('comment')
 def comment_complaint(request, pk):
     
     complaint = get_object_or_404(Complaint, pk=pk)
@@ -230,7 +240,9 @@ def comment_complaint(request, pk):
     if request.method == "POST":
         content = request.POST.get('comment', '').strip()
         if content:
-            Comment.objects.create(user=request.user, complaint=complaint, content=content)
+            with transaction.atomic():
+                Comment.objects.create(user=request.user, complaint=complaint, content=content)
+                Complaint.adjust_counters(complaint.pk, comments=1)
             messages.success(request, "You commented on the post.")
         else:
             messages.warning(request, "Comment cannot be empty.")
@@ -242,34 +254,22 @@ def comment_complaint(request, pk):
 @login_required(login_url='login')
 def search_complaints(request):
 
-    keyword = request.GET.get('q', '').strip()
-    category = request.GET.get('category')
-    municipality = request.GET.get('municipality')
-    status = request.GET.get('status')
-    ward_number = request.GET.get('ward_number')
+    filters = ComplaintFilterForm(request.GET).filters()
 
-    complaints = Complaint.objects.all()
+    complaints = Complaint.objects.for_feed(request.user)
     
-    if keyword:
-        complaints = complaints.filter(title__icontains=keyword)
-
-    if category:
-        complaints = complaints.filter(category__id=category)
-        
-    if municipality and ward_number:
-        complaints = complaints.filter(ward__ward_number=ward_number, ward__municipality_id=municipality)
-
-    if status:
-        complaints = complaints.filter(status=status)
-
-    post_count = complaints.count()
+    # Validated filters, one indexed query, always paginated
+    paginator = filter_paginator(complaints, filters, 6)
+    page = request.GET.get('cursor')
+    complaints = paginator.get_page(page)
+    post_count = paginator.count
 
     context = {
         'complaints': complaints,
         'post_count': post_count,
-        'links': Category.objects.all(),
-        'wards': Ward.objects.all(),
-        'statuses': Status.objects.all(),
+        'links': refdata.categories(),
+        'wards': refdata.wards(),
+        'statuses': refdata.statuses(),
     }
 
     return render(request, 'complaints/all_complaints.html', context)
@@ -279,35 +279,23 @@ def search_complaints(request):
 @login_required(login_url='login')
 def my_search_complaints(request):
 
-    keyword = request.GET.get('q', '').strip()
-    category = request.GET.get('category')
-    municipality = request.GET.get('municipality')
-    status = request.GET.get('status')
-    ward_number = request.GET.get('ward_number')
+    filters = ComplaintFilterForm(request.GET).filters()
 
-    complaints=Complaint.objects.filter(user=request.user).order_by('-created_at') 
+    complaints=Complaint.objects.for_feed(request.user).filter(user=request.user).order_by('-created_at') 
     
 
-    if keyword:
-        complaints = complaints.filter(title__icontains=keyword)
-
-    if category:
-        complaints = complaints.filter(category__id=category)
-        
-    if municipality and ward_number:
-        complaints = complaints.filter(ward__ward_number=ward_number, ward__municipality_id=municipality)
-
-    if status:
-        complaints = complaints.filter(status=status)
-
-    post_count = complaints.count()
+    # Validated filters, one indexed query, always paginated
+    paginator = filter_paginator(complaints, filters, 6)
+    page = request.GET.get('cursor')
+    complaints = paginator.get_page(page)
+    post_count = paginator.count
 
     context = {
         'complaints': complaints,
         'post_count': post_count,
-        'links': Category.objects.all(),
-        'wards': Ward.objects.all(),
-        'statuses': Status.objects.all(),
+        'links': refdata.categories(),
+        'wards': refdata.wards(),
+        'statuses': refdata.statuses(),
     }
 
     return render(request, 'complaints/my_complaints.html', context)
@@ -333,7 +321,9 @@ def delete_comment(request, comment_id):
 
     if request.user == comment.user or request.user == complaint.user:
         if request.method == 'POST':
-            comment.delete()
+            # Through the queryset, so a double submit deletes (and, in the
+            # post_delete receiver, decrements) only once.
+            Comment.objects.filter(pk=comment.pk).delete()
             messages.success(request, "Comment deleted successfully.")
             return redirect('post_detail', complaint.id)
     else:
@@ -346,8 +336,8 @@ def delete_comment(request, comment_id):
 @login_required
 def edit_complaint(request, complaint_id):
     complaint = get_object_or_404(Complaint, id=complaint_id, user=request.user)
-    wards = Ward.objects.all()
-    categories = Category.objects.all()
+    wards = refdata.wards()
+    categories = refdata.categories()
 
     if request.method == 'POST':
         title = request.POST.get('title')
@@ -356,17 +346,27 @@ def edit_complaint(request, complaint_id):
         description = request.POST.get('description')
         image = request.FILES.get('image')
 
+        if image:
+            try:
+                image = prepare_complaint_image(image)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+                return redirect('edit_complaint', complaint_id=complaint.id)
+
         # Update fields
         complaint.title = title
         complaint.description = description
-        complaint.ward = Ward.objects.get(id=ward_id) if ward_id else None
-        complaint.category = Category.objects.get(id=category_id) if category_id else None
+        complaint.ward = refdata.ward_by_id(ward_id) if ward_id else None
+        complaint.category = refdata.category_by_id(category_id) if category_id else None
         
         # Update image if new image is uploaded
         if image:
             complaint.image = image
 
-        complaint.save()
+        with transaction.atomic():
+            complaint.save()
+            if image:
+                enqueue_image_processing(complaint)
         messages.success(request, "Complaint Updated Successfully.")
         return redirect('my_complaints')
 
@@ -394,4 +394,5 @@ def edit_comment(request, comment_id):
             messages.success(request, "Comment updated successfully.")
             return redirect('post_detail', id=comment.complaint.id)
 
-    return render(request, 'complaints/edit_comment.html', {'comment': comment, 'complaint': comment.complaint})
+    complaint = Complaint.objects.for_feed(request.user).get(pk=comment.complaint_id)
+    return render(request, 'complaints/edit_comment.html', {'comment': comment, 'complaint': complaint})
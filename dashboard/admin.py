@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import WardStatusStats
+
+
+@admin.register(WardStatusStats)
+class WardStatusStatsAdmin(admin.ModelAdmin):
+    list_display = ['ward', 'status', 'count']
+    list_filter = ['status']
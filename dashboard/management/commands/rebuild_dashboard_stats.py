@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.stats import rebuild_ward_status_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-ward, per-status complaint counters used by the dashboards.'
+
+    def handle(self, *args, **options):
+        rows = rebuild_ward_status_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} ward/status counter row(s).'))
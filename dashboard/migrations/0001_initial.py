@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-18 14:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    WardStatusStats = apps.get_model('dashboard', 'WardStatusStats')
+    grouped = (
+        Complaint.objects.filter(is_hidden=False)
+        .order_by()
+        .values('ward', 'status')
+        .annotate(n=Count('pk'))
+    )
+    WardStatusStats.objects.bulk_create(
+        WardStatusStats(
+            ward_id=row['ward'],
+            status_id=row['status'],
+            bucket=f"{row['ward'] or 0}:{row['status'] or 0}",
+            count=row['n'],
+        )
+        for row in grouped
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('complaints', '0007_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WardStatusStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('bucket', models.CharField(max_length=41, unique=True)),
+                ('status', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ward_stats', to='complaints.status')),
+                ('ward', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='status_stats', to='complaints.ward')),
+            ],
+            options={
+                'verbose_name_plural': 'ward status stats',
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
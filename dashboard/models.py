@@ -1,3 +1,24 @@
 from django.db import models
 
-# Create your models here.
+from complaints.models import Status, Ward
+
+
+def bucket_key(ward_id, status_id):
+    return f'{ward_id or 0}:{status_id or 0}'
+
+
+class WardStatusStats(models.Model):
+    # Number of visible complaints per (ward, status), maintained
+    # incrementally by dashboard.stats so dashboards never COUNT(*).
+    ward = models.ForeignKey(Ward, on_delete=models.CASCADE, null=True, blank=True, related_name='status_stats')
+    status = models.ForeignKey(Status, on_delete=models.CASCADE, null=True, blank=True, related_name='ward_stats')
+    count = models.IntegerField(default=0)
+    # "<ward_id>:<status_id>" with 0 for NULL. A unique key on (ward, status)
+    # does not stop duplicate NULL buckets, and MySQL has no partial indexes.
+    bucket = models.CharField(max_length=41, unique=True)
+
+    class Meta:
+        verbose_name_plural = 'ward status stats'
+
+    def __str__(self):
+        return f"{self.ward} / {self.status}: {self.count}"
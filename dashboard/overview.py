@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from complaints.models import Category, Complaint, Municipality, Ward
+
+from .stats import global_status_counts
+
+OVERVIEW_KEY = 'dashboard:admin-overview'
+OVERVIEW_TIMEOUT = 300
+HITS_KEY = OVERVIEW_KEY + ':hits'
+MISSES_KEY = OVERVIEW_KEY + ':misses'
+
+
+def _incr(key):
+    # add() is a no-op when the key exists, so the counter is never reset.
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def compute_overview():
+    User = get_user_model()
+    # Visible complaints come from the stats table; the rest is one
+    # conditional aggregate per table.
+    users = User.objects.aggregate(
+        total_users=Count('pk', filter=~Q(user_type='admin')),
+        total_admin=Count('pk', filter=Q(user_type='admin')),
+    )
+    return {
+        'total_count': global_status_counts()['total_count'],
+        **users,
+        'total_municipalities': Municipality.objects.count(),
+        'total_reported_posts': Complaint.objects.filter(is_hidden=True).count(),
+        'total_categories': Category.objects.count(),
+        'total_wards': Ward.objects.count(),
+    }
+
+
+def admin_overview():
+    """The global totals shown on every admin page, cached until something they count changes."""
+    overview = cache.get(OVERVIEW_KEY)
+    if overview is not None:
+        _incr(HITS_KEY)
+        return overview
+    _incr(MISSES_KEY)
+    overview = compute_overview()
+    cache.set(OVERVIEW_KEY, overview, OVERVIEW_TIMEOUT)
+    return overview
+
+
+def invalidate_overview():
+    # Drop the snapshot only once the change is committed, so a concurrent
+    # request cannot re-cache the old totals in between.
+    transaction.on_commit(lambda: cache.delete(OVERVIEW_KEY))
+
+
+def overview_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 3) if lookups else None,
+        'cached': cache.get(OVERVIEW_KEY) is not None,
+    }
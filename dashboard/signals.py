@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from complaints.models import Category, Complaint, Municipality, Status, Ward
+
+from . import overview, stats
+
+
+def _loaded_key(complaint):
+    if not hasattr(complaint, '_loaded_values') or complaint.loaded_value('is_hidden', False):
+        return None
+    return (complaint.loaded_value('ward_id'), complaint.loaded_value('status_id'))
+
+
+def _current_key(complaint):
+    if complaint.is_hidden:
+        return None
+    return (complaint.ward_id, complaint.status_id)
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_saved(sender, instance, created, **kwargs):
+    old_key = None if created else _loaded_key(instance)
+    stats.apply_change(old_key, _current_key(instance))
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted(sender, instance, **kwargs):
+    stats.apply_change(_current_key(instance), None)
+
+
+# Deleting a ward or status sets the complaints' column to NULL with a plain
+# UPDATE, bypassing the receivers above, and cascades its own buckets away.
+@receiver(post_delete, sender=Ward)
+def ward_deleted(sender, instance, **kwargs):
+    stats.rebuild_ward_status_stats(ward__isnull=True)
+
+
+@receiver(post_delete, sender=Status)
+def status_deleted(sender, instance, **kwargs):
+    stats.rebuild_ward_status_stats(status__isnull=True)
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_saved_overview(sender, instance, created, **kwargs):
+    if created or instance.loaded_value('is_hidden', instance.is_hidden) != instance.is_hidden:
+        overview.invalidate_overview()
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Logins only touch last_login; only new users or role changes move the totals.
+    if created or update_fields is None or 'user_type' in update_fields:
+        overview.invalidate_overview()
+
+
+@receiver(post_save, sender=Municipality)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Ward)
+def reference_saved(sender, instance, created, **kwargs):
+    if created:
+        overview.invalidate_overview()
+
+
+@receiver(post_delete, sender=Complaint)
+@receiver(post_delete, sender=get_user_model())
+@receiver(post_delete, sender=Municipality)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Ward)
+def overview_row_deleted(sender, instance, **kwargs):
+    overview.invalidate_overview()
@@ -0,0 +1,91 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from complaints.models import Complaint
+
+from .models import WardStatusStats, bucket_key
+
+# Dashboard counter keys for the statuses the dashboards display.
+STATUS_KEYS = {
+    'Pending': 'pending_count',
+    'In Progress': 'in_progress_count',
+    'Resolved': 'resolved_count',
+}
+
+
+def _empty_counts():
+    counts = {key: 0 for key in STATUS_KEYS.values()}
+    counts['total_count'] = 0
+    return counts
+
+
+def _collect(rows):
+    counts = _empty_counts()
+    for status_name, count in rows:
+        counts['total_count'] += count or 0
+        key = STATUS_KEYS.get(status_name)
+        if key:
+            counts[key] += count or 0
+    return counts
+
+
+def ward_status_counts(ward):
+    """Total and per-status visible complaint counts for one ward, in one small query."""
+    rows = WardStatusStats.objects.filter(ward=ward).values_list('status__name', 'count')
+    return _collect(rows)
+
+
+def global_status_counts():
+    """Visible complaint counts over every ward, summed from the stats table."""
+    rows = WardStatusStats.objects.values('status__name').annotate(n=Sum('count')).values_list('status__name', 'n')
+    return _collect(rows)
+
+
+def _bump(ward_id, status_id, delta):
+    bucket = bucket_key(ward_id, status_id)
+    updated = WardStatusStats.objects.filter(bucket=bucket).update(count=F('count') + delta)
+    if updated or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            WardStatusStats.objects.create(ward_id=ward_id, status_id=status_id, bucket=bucket, count=delta)
+    except IntegrityError:
+        # Another request created the row first.
+        WardStatusStats.objects.filter(bucket=bucket).update(count=F('count') + delta)
+
+
+def apply_change(old_key, new_key):
+    """
+    Move one complaint between (ward_id, status_id) buckets. A key of None
+    means the complaint was not counted (new, hidden or deleted).
+    """
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        _bump(*old_key, -1)
+    if new_key is not None:
+        _bump(*new_key, 1)
+
+
+def rebuild_ward_status_stats(**lookups):
+    """
+    Recompute the buckets matching ``lookups`` (all of them by default)
+    with a single grouped query, e.g. ``ward__isnull=True`` after a ward
+    delete has moved its complaints to the no-ward buckets.
+    """
+    grouped = (
+        Complaint.objects.filter(is_hidden=False, **lookups)
+        .order_by()
+        .values('ward', 'status')
+        .annotate(n=Count('pk'))
+    )
+    rows = [
+        WardStatusStats(
+            ward_id=row['ward'], status_id=row['status'], bucket=bucket_key(row['ward'], row['status']), count=row['n'],
+        )
+        for row in grouped
+    ]
+    with transaction.atomic():
+        WardStatusStats.objects.filter(**lookups).delete()
+        WardStatusStats.objects.bulk_create(rows)
+    return len(rows)
@@ -12,8 +12,10 @@ urlpatterns = [
    path('complaints/<int:id>/update-status/', views.update_complaint_status, name='update_complaint_status'),
    path('admin/search/', views.admin_search, name='admin_search'),
    path('admin/category/', views.admin_search_complaints, name='admin_search_complaints'),
+   path('admin/category/export/', views.admin_export_complaints, name='admin_export_complaints'),
    path('admin/complaint/<int:pk>/delete/', views.admin_delete_complaint, name='admin_delete_complaint'),
    path('admin/comment/<int:comment_id>/delete/', views.admin_delete_comment, name='admin_delete_comment'),
    path('delete-user/<int:user_id>/',views.delete_user, name='delete_user'),
    path('complaint/<int:id>/update-visibility/',views.update_complaint_visibility, name='update_complaint_visibility'),
+   path('admin/overview-cache/', views.overview_cache_status, name='overview_cache_status'),
 ]
\ No newline at end of file
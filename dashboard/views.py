@@ -1,11 +1,19 @@
+import csv
+import itertools
+
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required 
 from django.contrib.auth import get_user_model
 from django.contrib import messages
-from complaints.models import Comment, Complaint, Ward, Category, Status, Municipality 
+from complaints import refdata
+from complaints.models import Comment, Complaint
+from complaints.pagination import CursorPaginator
+from complaints.filters import ComplaintFilterForm, filter_paginator, iter_filtered
+from complaints.search import search_paginator
+from .overview import admin_overview, overview_cache_stats
+from .stats import ward_status_counts
 from django.contrib.auth import get_user_model
-from django.core.paginator import Paginator
-from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
 
 
 
@@ -17,29 +25,23 @@ def municipality_dashboard(request):
     if user.is_authenticated and user.user_type == 'municipality':
         
         # Get complaints where complaint's ward municipality matches user's municipality
-        complaints_list = Complaint.objects.filter(ward=user.ward ,is_hidden=False).order_by('-created_at')
-        total_count=complaints_list.count()
-        
+        complaints_list = Complaint.objects.for_feed(user).filter(ward=user.ward ,is_hidden=False).order_by('-created_at')
+
         #Count complaints by status
-        pending_count = complaints_list.filter(status__name='Pending').count()
-        in_progress_count = complaints_list.filter(status__name='In Progress').count()
-        resolved_count = complaints_list.filter(status__name='Resolved').count()
+        status_counts = ward_status_counts(user.ward)
 
-        paginator = Paginator(complaints_list, 6)
-        page_number = request.GET.get('page')
+        paginator = CursorPaginator(complaints_list, 6)
+        page_number = request.GET.get('cursor')
         page_obj = paginator.get_page(page_number)
         post_count = paginator.count 
         
         context = {
             'complaints': page_obj, 
-            'wards': Ward.objects.filter(municipality=user.municipality),
-            'statuses': Status.objects.all(),
-            'links': Category.objects.all(),
-            'total_count': total_count,
+            'wards': [ward for ward in refdata.wards() if ward.municipality_id == user.municipality_id],
+            'statuses': refdata.statuses(),
+            'links': refdata.categories(),
             'post_count': post_count,
-            'pending_count': pending_count,
-            'in_progress_count': in_progress_count,
-            'resolved_count': resolved_count,
+            **status_counts,
         }
         return render(request, 'dashboard/municipality_dashboard.html', context)
     
@@ -52,48 +54,30 @@ def municipality_dashboard(request):
 @login_required(login_url='login')
 def dashboard_my_search_complaints(request):
 
-    keyword = request.GET.get('q', '').strip()
-    category = request.GET.get('category')
-    municipality = request.GET.get('municipality')
-    status = request.GET.get('status')
-    ward_number = request.GET.get('ward_number')
+    filters = ComplaintFilterForm(request.GET).filters()
     
     
     user = request.user
     if user.is_authenticated and user.user_type == 'municipality':
-        complaints = Complaint.objects.filter(ward=user.ward ,is_hidden=False).order_by('-created_at')
-        total_count=complaints.count()
-   
+        complaints = Complaint.objects.for_feed(user).filter(ward=user.ward ,is_hidden=False).order_by('-created_at')
+
         #Count complaints by status
-        pending_count = complaints.filter(status__name='Pending').count()
-        in_progress_count = complaints.filter(status__name='In Progress').count()
-        resolved_count = complaints.filter(status__name='Resolved').count()
+        status_counts = ward_status_counts(user.ward)
 
     
-    if keyword:
-        complaints = complaints.filter(title__icontains=keyword)
-
-    if category:
-        complaints = complaints.filter(category__id=category)
-        
-    if municipality and ward_number:
-        complaints = complaints.filter(ward__ward_number=ward_number, ward__municipality_id=municipality)
-
-    if status:
-        complaints = complaints.filter(status=status)
-
-    post_count = complaints.count()
+    # Validated filters, one indexed query, always paginated
+    paginator = filter_paginator(complaints, filters, 6)
+    page = request.GET.get('cursor')
+    complaints = paginator.get_page(page)
+    post_count = paginator.count
 
     context = {
         'complaints': complaints,
-        'total_count':total_count,
         'post_count': post_count,
-        'links': Category.objects.all(),
-        'wards': Ward.objects.all(),
-        'statuses': Status.objects.all(),
-        'pending_count': pending_count,
-        'in_progress_count': in_progress_count,
-        'resolved_count': resolved_count,
+        'links': refdata.categories(),
+        'wards': refdata.wards(),
+        'statuses': refdata.statuses(),
+        **status_counts,
     }
 
     return render(request, 'dashboard/municipality_dashboard.html', context)
@@ -103,42 +87,25 @@ def dashboard_my_search_complaints(request):
 def dashboard_search(request):
     user = request.user
     if user.is_authenticated and user.user_type == 'municipality':
-        complaints = Complaint.objects.filter(ward=user.ward, is_hidden=False ).order_by('-created_at')
-        total_count=complaints.count()
+        complaints = Complaint.objects.for_feed(user).filter(ward=user.ward, is_hidden=False ).order_by('-created_at')
 
         # Count complaints by status 
-        pending_count = complaints.filter(status__name='Pending').count()
-        in_progress_count = complaints.filter(status__name='In Progress').count()
-        resolved_count = complaints.filter(status__name='Resolved').count()
-
-        # Search
-        keyword = request.GET.get('q', '').strip().lower()
-        if keyword:
-            complaints = complaints.filter(
-                Q(title__icontains=keyword) |
-                Q(description__icontains=keyword) |
-                Q(category__category_name__icontains=keyword) |
-                Q(ward__ward_number__icontains=keyword) |
-                Q(ward__municipality__name__icontains=keyword)
-            ).distinct()
-
-        post_count = complaints.count()
-
-        # Pagination
-        paginator = Paginator(complaints, 6)
-        page = request.GET.get('page')
+        status_counts = ward_status_counts(user.ward)
+
+        # Search, relevance-ranked and paginated
+        keyword = request.GET.get('q', '').strip()
+        paginator = search_paginator(complaints, keyword, 6)
+        page = request.GET.get('cursor')
         complaints = paginator.get_page(page)
+        post_count = paginator.count
 
         context = {
             'complaints': complaints,
             'post_count': post_count,
-            'total_count': total_count,
-            'links': Category.objects.all(),
-            'wards': Ward.objects.all(),
-            'statuses': Status.objects.all(),
-            'pending_count': pending_count,
-            'in_progress_count': in_progress_count,
-            'resolved_count': resolved_count,
+            'links': refdata.categories(),
+            'wards': refdata.wards(),
+            'statuses': refdata.statuses(),
+            **status_counts,
         }
         return render(request, 'dashboard/municipality_dashboard.html', context)
 
@@ -154,12 +121,12 @@ def update_complaint_status(request, id):
     if request.method == "POST":
         status_id = request.POST.get("status")
         if status_id:
-            try:
-                status_obj = Status.objects.get(id=status_id)
+            status_obj = refdata.status_by_id(status_id)
+            if status_obj is not None:
                 complaint.status = status_obj
                 complaint.save()
                 messages.success(request, "Complaint status updated successfully.")
-            except Status.DoesNotExist:
+            else:
                 messages.error(request, "Invalid status selected.")
         else:
             messages.error(request, "Please select a status.")
@@ -172,37 +139,25 @@ def update_complaint_status(request, id):
 def admin_dashboard(request):
     
     if request.user.is_authenticated and request.user.user_type == 'admin':
-        complaints_list = Complaint.objects.filter(is_hidden=False).order_by('-created_at')
-        total_count=complaints_list.count()
-        paginator = Paginator(complaints_list, 6) # 6 complaints per page
+        complaints_list = Complaint.objects.for_feed(request.user).filter(is_hidden=False).order_by('-created_at')
+        paginator = CursorPaginator(complaints_list, 6) # 6 complaints per page
     
-        page_number = request.GET.get('page')
+        page_number = request.GET.get('cursor')
         page_obj = paginator.get_page(page_number)
         post_count = paginator.count
 
         # Extra counts for admin overview
-        total_users = User.objects.exclude(user_type='admin').count()
-        total_admin = User.objects.filter(user_type='admin').count()
-        total_municipalities = Municipality.objects.count()
-        total_reported_posts = Complaint.objects.filter(is_hidden=True).count()
-        total_categories = Category.objects.count()
-        total_wards = Ward.objects.count()
+        overview = admin_overview()
 
         context = {
             'complaints': page_obj,
-            'wards': Ward.objects.all(),
-            'statuses': Status.objects.all(),
-            'links': Category.objects.all(),
+            'wards': refdata.wards(),
+            'statuses': refdata.statuses(),
+            'links': refdata.categories(),
             'post_count': post_count,
 
             # New data for dashboard overview
-            'total_count':total_count,
-            'total_users': total_users,
-            'total_municipalities': total_municipalities,
-            'total_reported_posts': total_reported_posts,
-            'total_categories': total_categories,
-            'total_wards': total_wards,
-            'total_admin':total_admin
+            **overview,
 
         }
 
@@ -215,53 +170,31 @@ def admin_dashboard(request):
 @login_required(login_url='login')
 def admin_search(request):
     
-    complaints = Complaint.objects.filter(is_hidden=False).order_by('-created_at')
-    total_count=complaints.count()
+    complaints = Complaint.objects.for_feed(request.user).filter(is_hidden=False).order_by('-created_at')
     post_count = 0
     
     #Extra counts for admin overview
-    total_users = User.objects.exclude(user_type='admin').count()
-    total_admin = User.objects.filter(user_type='admin').count()
-    total_municipalities = Municipality.objects.count()
-    total_reported_posts = Complaint.objects.filter(is_hidden=True).count()
-    total_categories = Category.objects.count()
-    total_wards = Ward.objects.count()
-    
+    overview = admin_overview()
     
     
     
-    keyword = request.GET.get('q', '').strip().lower()
     
-    if keyword:
-        complaints = complaints.filter(
-            Q(title__icontains=keyword) |
-            Q(description__icontains=keyword) |
-            Q(category__category_name__icontains=keyword) |
-            Q(ward__ward_number__icontains=keyword) |
-            Q(municipality__name__icontains=keyword)
-        ).order_by('-created_at').distinct()
-
-    post_count = complaints.filter(is_hidden=False).count()
-
-    # Pagination
-    paginator = Paginator(complaints, 6)
-    page = request.GET.get('page')
+    keyword = request.GET.get('q', '').strip()
+
+    # Search, relevance-ranked and paginated
+    paginator = search_paginator(complaints, keyword, 6)
+    page = request.GET.get('cursor')
     complaints = paginator.get_page(page)
+    post_count = paginator.count
 
     context = {
         'complaints': complaints,
         'post_count': post_count,
-        'links': Category.objects.all(),
-        'wards': Ward.objects.all(),
-        'statuses': Status.objects.all(),
+        'links': refdata.categories(),
+        'wards': refdata.wards(),
+        'statuses': refdata.statuses(),
         # New data for dashboard overview
-        'total_count':total_count,
-        'total_users': total_users,
-        'total_municipalities': total_municipalities,
-        'total_reported_posts': total_reported_posts,
-        'total_categories': total_categories,
-        'total_wards': total_wards,
-        'total_admin':total_admin
+        **overview,
     }
     return render(request, 'dashboard/admin_dashboard.html', context)
 
@@ -269,61 +202,66 @@ def admin_search(request):
 # Catagory search for all complaints
 @login_required(login_url='login')
 def admin_search_complaints(request):
-    
-    complaints_list = Complaint.objects.filter(is_hidden=False).order_by('-created_at')
-    total_count=complaints_list.count()
-    
-    
+
     #Extra counts for admin overview
-    total_users = User.objects.exclude(user_type='admin').count()
-    total_admin = User.objects.filter(user_type='admin').count()
-    total_municipalities = Municipality.objects.count()
-    total_reported_posts = Complaint.objects.filter(is_hidden=True).count()
-    total_categories = Category.objects.count()
-    total_wards = Ward.objects.count()
-    
+    overview = admin_overview()
 
-    keyword = request.GET.get('q', '').strip()
-    category = request.GET.get('category')
-    municipality = request.GET.get('municipality')
-    status = request.GET.get('status')
-    ward_number = request.GET.get('ward_number')
-
-    complaints = Complaint.objects.all()
-     
-    if keyword:
-        complaints = complaints.filter(title__icontains=keyword)
-
-    if category:
-        complaints = complaints.filter(category__id=category)
-        
-    if municipality and ward_number:
-        complaints = complaints.filter(ward__ward_number=ward_number, ward__municipality_id=municipality)
+    filters = ComplaintFilterForm(request.GET).filters()
 
-    if status:
-        complaints = complaints.filter(status=status)
+    complaints = Complaint.objects.for_feed(request.user).filter(is_hidden=False)
 
-    post_count = complaints.filter(is_hidden=False).count()
+    # Validated filters, one indexed query, always paginated
+    paginator = filter_paginator(complaints, filters, 6)
+    page = request.GET.get('cursor')
+    complaints = paginator.get_page(page)
+    post_count = paginator.count
 
     context = {
         'complaints': complaints,
         'post_count': post_count,
-        'links': Category.objects.all(),
-        'wards': Ward.objects.all(),
-        'statuses': Status.objects.all(),
+        'links': refdata.categories(),
+        'wards': refdata.wards(),
+        'statuses': refdata.statuses(),
         # New data for dashboard overview
-        'total_count':total_count,
-        'total_users': total_users,
-        'total_municipalities': total_municipalities,
-        'total_reported_posts': total_reported_posts,
-        'total_categories': total_categories,
-        'total_wards': total_wards,
-        'total_admin':total_admin
+        **overview,
     }
 
     return render(request, 'dashboard/admin_dashboard.html', context)
 
 
+class Echo:
+    # csv.writer target that hands each row back instead of buffering it.
+    def write(self, value):
+        return value
+
+
+# Export the filtered complaints as CSV, streamed in bounded chunks
+@login_required(login_url='login')
+def admin_export_complaints(request):
+    if request.user.user_type != 'admin':
+        messages.error(request, 'You are not authorized to view this page.')
+        return redirect('login')
+
+    filters = ComplaintFilterForm(request.GET).filters()
+    complaints = Complaint.objects.for_feed(request.user).filter(is_hidden=False)
+
+    writer = csv.writer(Echo())
+    header = ['id', 'title', 'category', 'municipality', 'ward', 'status', 'likes', 'comments', 'reports', 'created_at']
+    rows = (
+        [
+            c.id, c.title, c.category, c.municipality, c.ward and c.ward.ward_number, c.status,
+            c.likes_count, c.comments_count, c.reports_count, c.created_at.isoformat(),
+        ]
+        for c in iter_filtered(complaints, filters)
+    )
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in itertools.chain([header], rows)),
+        content_type='text/csv',
+    )
+    response['Content-Disposition'] = 'attachment; filename="complaints.csv"'
+    return response
+
+
 @login_required
 def admin_delete_complaint(request, pk):
     complaint = get_object_or_404(Complaint, pk=pk)
@@ -350,7 +288,9 @@ def admin_delete_comment(request, comment_id):
         return redirect('post_detail', complaint.id)
 
     if request.method == 'POST':
-        comment.delete()
+        # Through the queryset, so a double submit deletes (and, in the
+        # post_delete receiver, decrements) only once.
+        Comment.objects.filter(pk=comment.pk).delete()
         messages.success(request, "Comment deleted successfully.")
         return redirect('post_detail', complaint.id)
 
@@ -361,37 +301,25 @@ def admin_delete_comment(request, comment_id):
 @login_required(login_url='login')
 def reported_complaints(request): 
     if request.user.is_authenticated and request.user.user_type == 'admin':
-        complaints_list = Complaint.objects.filter(is_hidden=True).order_by('-created_at')
-        total_count=Complaint.objects.filter(is_hidden=False).count()
-        paginator = Paginator(complaints_list, 6) # 6 complaints per page
+        complaints_list = Complaint.objects.for_feed(request.user).filter(is_hidden=True).order_by('-created_at')
+        paginator = CursorPaginator(complaints_list, 6) # 6 complaints per page
     
-        page_number = request.GET.get('page')
+        page_number = request.GET.get('cursor')
         page_obj = paginator.get_page(page_number)
         post_count = paginator.count
 
         # Extra counts for admin overview
-        total_users = User.objects.exclude(user_type='admin').count()
-        total_admin = User.objects.filter(user_type='admin').count()
-        total_municipalities = Municipality.objects.count()
-        total_reported_posts = Complaint.objects.filter(is_hidden=True).count()
-        total_categories = Category.objects.count()
-        total_wards = Ward.objects.count()
+        overview = admin_overview()
 
         context = {
             'complaints': page_obj,
-            'wards': Ward.objects.all(),
-            'statuses': Status.objects.all(),
-            'links': Category.objects.all(),
+            'wards': refdata.wards(),
+            'statuses': refdata.statuses(),
+            'links': refdata.categories(),
             'post_count': post_count,
 
             # New data for dashboard overview
-            'total_count':total_count,
-            'total_users': total_users,
-            'total_municipalities': total_municipalities,
-            'total_reported_posts': total_reported_posts,
-            'total_categories': total_categories,
-            'total_wards': total_wards,
-            'total_admin':total_admin
+            **overview,
 
         }
 
@@ -415,28 +343,16 @@ def delete_user(request, user_id):
 @login_required(login_url='login')
 def user_details(request):
     users = User.objects.exclude(user_type='admin')
-    user_count=users.count()
-    
-    total_users = User.objects.exclude(user_type='admin').count()
-    total_admin = User.objects.filter(user_type='admin').count()
-    total_municipalities = Municipality.objects.count()
-    total_reported_posts = Complaint.objects.filter(is_hidden=True).count()
-    total_categories = Category.objects.count()
-    total_wards = Ward.objects.count()
+    overview = admin_overview()
+    user_count = overview['total_users']
     
     context = {
         'users': users,
-        'wards': Ward.objects.all(),
-        'statuses': Status.objects.all(),
-        'links': Category.objects.all(),
+        'wards': refdata.wards(),
+        'statuses': refdata.statuses(),
+        'links': refdata.categories(),
         'user_count': user_count,
-        'total_users': total_users,
-        'total_municipalities': total_municipalities,
-        'total_reported_posts': total_reported_posts,
-        'total_categories': total_categories,
-        'total_wards': total_wards,
-        'total_admin':total_admin
-
+        **overview,
         }
     
     return render(request, 'dashboard/user_details.html', context)
@@ -453,9 +369,16 @@ def update_complaint_visibility(request, id):
     if request.method == "POST":
         is_hidden_value = request.POST.get("is_hidden")
         complaint.is_hidden = (is_hidden_value == "true")
-        complaint.save()
+        complaint.save(update_fields=['is_hidden', 'updated_at'])
 
         action = "hidden" if complaint.is_hidden else "unhidden"
         messages.success(request, f"Post successfully {action}.")
 
-    return redirect('post_detail', id=id)
\ No newline at end of file
+    return redirect('post_detail', id=id)
+
+
+@login_required(login_url='login')
+def overview_cache_status(request):
+    if request.user.user_type != 'admin':
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    return JsonResponse(overview_cache_stats())